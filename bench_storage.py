@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark comparing the storage backends (MariaDB vs embedded SQLite).
+
+Simulates the scanner/web app workload on N hosts: one full scan cycle
+(state load + per-host UPDATE + history executemany + single commit) and
+the dashboard query (ORDER BY INET_ATON). MariaDB is benchmarked only when
+DB credentials are set in .env; the SQLite database is a temporary file.
+
+Usage: python bench_storage.py [--hosts 500] [--rounds 5]
+"""
+
+# === Imports ===
+import os, sys, time, argparse, tempfile, statistics
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from mainetwork_scanner import storage
+
+# === Workload ===
+def _reset(conn, hosts):
+    cursor = conn.cursor()
+    # Only the synthetic 10.99.0.0/16 rows are touched, real hosts/history are left alone
+    cursor.execute("DELETE FROM host_history WHERE ip_address LIKE '10.99.%'"); cursor.execute("DELETE FROM hosts WHERE ip_address LIKE '10.99.%'")
+    rows = [(f"10.99.{i // 256}.{i % 256}", f"02:00:00:00:{i // 256:02x}:{i % 256:02x}", "Bench Vendor") for i in range(hosts)]
+    cursor.executemany("INSERT INTO hosts (ip_address, mac_address, vendor, status, first_seen, last_seen_online) VALUES (?, ?, ?, 'OFFLINE', NOW(), NOW())", rows)
+    conn.commit(); cursor.close()
+
+def _scan_cycle(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT ip_address, mac_address, vendor, hostname, ports, note, status, known_host, last_seen_online FROM hosts WHERE ip_address LIKE '10.99.%'")
+    state = cursor.fetchall(); cursor.close()
+    now_ts_utc = datetime.now(timezone.utc); history_inserts = []
+    cursor = conn.cursor()
+    for row in state:
+        new_status = 'OFFLINE' if row['status'] == 'ONLINE' else 'ONLINE'
+        cursor.execute(f"UPDATE hosts SET status = '{new_status}', last_seen_online = NOW() WHERE ip_address = ?", (row['ip_address'],))
+        history_inserts.append((row['ip_address'], 1 if new_status == 'ONLINE' else 0, now_ts_utc))
+    cursor.executemany("INSERT INTO host_history (ip_address, status, event_time) VALUES (?, ?, ?)", history_inserts)
+    conn.commit(); cursor.close()
+
+def _dashboard_query(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT ip_address, mac_address, vendor, hostname, ports, note, status, known_host, first_seen, last_seen_online, last_updated FROM hosts ORDER BY INET_ATON(ip_address)")
+    cursor.fetchall(); cursor.close()
+
+def run_backend(name, connect_fn, hosts, rounds):
+    t0 = time.perf_counter(); conn = connect_fn(); connect_ms = (time.perf_counter() - t0) * 1000
+    _reset(conn, hosts)
+    results = {"connect": [connect_ms], "scan_cycle": [], "dashboard": []}
+    for _ in range(rounds):
+        t0 = time.perf_counter(); _scan_cycle(conn); results["scan_cycle"].append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter(); _dashboard_query(conn); results["dashboard"].append((time.perf_counter() - t0) * 1000)
+    _reset(conn, 0); conn.close()
+    print(f"\n[{name}] hosts={hosts} rounds={rounds}")
+    for label, samples in results.items():
+        print(f"  {label:<11} median {statistics.median(samples):9.2f} ms   min {min(samples):9.2f} ms")
+
+# === Main Execution Block ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MariaDB vs SQLite storage backends.")
+    parser.add_argument("--hosts", type=int, default=500); parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(); load_dotenv()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_backend("sqlite (WAL)", lambda: storage.connect_sqlite(os.path.join(tmp_dir, "bench.db")), args.hosts, args.rounds)
+
+    db_user, db_password, db_name = os.getenv("DB_USER"), os.getenv("DB_PASSWORD"), os.getenv("DB_NAME")
+    if storage.mariadb is None or not all([db_user, db_password, db_name]):
+        print("\n[mariadb] skipped (connector not installed or DB credentials missing)."); sys.exit(0)
+    try:
+        run_backend("mariadb", lambda: storage.connect_mariadb(os.getenv("DB_HOST", "localhost"), int(os.getenv("DB_PORT", 3306)), db_user, db_password, db_name), args.hosts, args.rounds)
+    except storage.DB_ERRORS as e:
+        print(f"\n[mariadb] failed: {e}"); sys.exit(1)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+"""
+MaiNetwork Scanner core package.
+
+Importing the package (or any core module: config, oui, ports, db, storage)
+has no side effects: no .env loading, no logging setup and no Scapy import.
+Scapy is loaded lazily by mainetwork_scanner.probes on the first ARP/ping
+probe, and the scanner entry point lives in mainetwork_scanner.cli
+(wrapped by network_scanner_db.py for run_scanner.sh).
+"""
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""Scanner entry point: one scan cycle (purge, OUI load, ARP scan, DB update, report)."""
+
+# === Imports ===
+import os, sys, logging, time, argparse
+from datetime import datetime
+from . import config, db, oui, outbox, ports, probes, profiling, storage
+
+# === Helper Functions ===
+def setup_logging():
+    logging.basicConfig(level=config.LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S', stream=sys.stdout)
+
+def check_root():
+    if os.geteuid() != 0: logging.critical("ERROR: Root privileges required."); sys.exit(1)
+
+# === Console Output Function ===
+def print_results(final_state): # Unchanged logic
+    logging.info("\n--- Network Scan Results (Current Status) ---")
+    if not final_state: logging.info("No hosts found or state to report."); return
+    hostname_width=20; ports_width=30; note_width=20; known_width=5; vendor_width=25; total_width = 18+1+20+1+vendor_width+1+hostname_width+1+ports_width+1+note_width+1+known_width+1+15
+    header = f"{'IP Address':<18} {'MAC Address':<20} {'Vendor':<{vendor_width}} {'Hostname':<{hostname_width}} {'Ports':<{ports_width}} {'Note':<{note_width}} {'Known':<{known_width}} {'Status':<10}"; separator = "-" * len(header)
+    logging.info(header); logging.info(separator)
+    for ip in final_state: data=final_state[ip]; mac=data.get('mac') or 'N/A'; vendor=data.get('vendor') or 'N/A'; hostname=data.get('hostname') or ''; ports=data.get('ports') or ''; note=data.get('note') or ''; known='Y' if data.get('known_host',0)==1 else 'N'; status=data.get('status') or 'N/A'; logging.info(f"{ip:<18} {mac:<20} {vendor:<{vendor_width}} {hostname:<{hostname_width}} {ports:<{ports_width}} {note:<{note_width}} {known:<{known_width}} {status:<10}")
+    logging.info(separator); logging.info(f"Total hosts monitored: {len(final_state)}")
+
+def positive_int(value):
+    """argparse type: integer >= 1."""
+    try: number = int(value)
+    except ValueError: raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1: raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MaiNetwork Scanner: run one scan cycle.")
+    parser.add_argument("--profile", action=argparse.BooleanOptionalAction, default=None, help="Profile the cycle with cProfile, or not with --no-profile (default: PROFILE_ENABLED in .env).")
+    parser.add_argument("--profile-threshold", type=float, default=None, metavar="SECONDS", help="Keep the profile only if the cycle takes at least SECONDS (default: PROFILE_THRESHOLD_SECONDS).")
+    parser.add_argument("--profile-dir", default=None, help="Directory for kept profiles, relative to the project directory like PROFILE_DIR (default: PROFILE_DIR).")
+    parser.add_argument("--profile-keep", type=positive_int, default=None, metavar="N", help="Keep only the newest N cycle profiles (default: PROFILE_KEEP).")
+    return parser.parse_args(argv)
+
+# === Main Execution ===
+def main(argv=None):
+    config.load(); args = parse_args(argv)
+    setup_logging()
+    profile_enabled = config.PROFILE_ENABLED if args.profile is None else args.profile
+    if not profile_enabled: run_cycle(); return
+
+    threshold = config.PROFILE_THRESHOLD_SECONDS if args.profile_threshold is None else args.profile_threshold
+    profile_dir = config.PROFILE_DIR if args.profile_dir is None else os.path.join(config.PROJECT_DIR, args.profile_dir)
+    keep = config.PROFILE_KEEP if args.profile_keep is None else args.profile_keep
+    profiler = profiling.Profiler().start()
+    try: run_cycle()
+    finally:
+        elapsed = profiler.stop(); profile_path = profiler.save_if_slow(profile_dir, "cycle", threshold, keep)
+        if profile_path:
+            logging.warning(f"Slow scan cycle ({elapsed:.2f}s >= {threshold}s), profile saved: {profile_path}")
+            logging.info(f"Top functions (cumulative):\n{profiling.top_functions(profiler, 15)}")
+        else: logging.info(f"Profiling: cycle took {elapsed:.2f}s (threshold {threshold}s), profile discarded.")
+
+def run_cycle():
+    logging.info("Starting Network Scanner DB Script..."); start_time = datetime.now()
+    check_root()
+    if not config.NETWORK_RANGE: logging.critical("ERROR: NETWORK_RANGE not defined."); sys.exit(1)
+    if config.DB_BACKEND == storage.BACKEND_MARIADB and not all([config.DB_USER, config.DB_PASSWORD, config.DB_NAME]): logging.critical("ERROR: DB credentials not defined."); sys.exit(1)
+    logging.info(f"Config: Net={config.NETWORK_RANGE}, DB={config.DB_BACKEND}, PortScan={config.PORT_SCAN_ENABLED}, Range='{config.PORT_SCAN_RANGE_STR}', Threads={config.PORT_SCAN_THREADS}, Interval={config.SCAN_PORT_INTERVAL_SECONDS}s, PurgeHours={config.PURGE_HISTORY_HOURS}, LogLevel={config.LOG_LEVEL_NAME}")
+
+    # Port Scan Interval Logic (Syntax Corrected)
+    do_port_scan_this_run = False
+    if config.PORT_SCAN_ENABLED:
+        ports_to_scan_set = ports.parse_port_range(config.PORT_SCAN_RANGE_STR)
+        if not ports_to_scan_set: logging.warning("WARNING: No valid ports. Port scanning DISABLED.")
+        else:
+            logging.info(f"INFO: {len(ports_to_scan_set)} ports configured."); now_ts_float = time.time(); last_scan_ts_float = 0.0
+            try:
+                if os.path.exists(config.PORT_SCAN_STATE_FILE):
+                    with open(config.PORT_SCAN_STATE_FILE, 'r') as f: last_scan_ts_float = float(f.read().strip())
+            except (ValueError, IOError) as e: logging.warning(f"WARNING: Error reading port scan state file: {e}. Forcing scan."); last_scan_ts_float = 0.0
+            time_since_last = now_ts_float - last_scan_ts_float
+            if time_since_last >= config.SCAN_PORT_INTERVAL_SECONDS:
+                logging.info(f"INFO: Port scan interval elapsed. Enabling scan."); do_port_scan_this_run = True
+                try: # Correctly indented block
+                    with open(config.PORT_SCAN_STATE_FILE, 'w') as f:
+                        f.write(str(now_ts_float))
+                except IOError as e: logging.error(f"ERROR: Failed update port scan state file: {e}"); logging.warning(f"WARNING: Next port scan might occur sooner.")
+            else: logging.info(f"INFO: Port scan interval not elapsed. Skipping.")
+    else: ports_to_scan_set = set()
+
+    db_connection = db.connect_db()
+    if db_connection and config.OUTBOX_ENABLED and not outbox.table_exists(db_connection):
+        logging.warning("WARNING: OUTBOX_ENABLED but the event_outbox table is missing (re-run setup_environment.sh), notifications disabled for this run.")
+        config.OUTBOX_ENABLED = False
+
+    # Purge History
+    if db_connection:
+        db.purge_old_history(db_connection, config.PURGE_HISTORY_HOURS)
+
+    # Load OUI data
+    oui_available = False
+    if oui.download_oui_file(config.OUI_URL, config.OUI_FILE):
+        if oui.parse_oui_file(config.OUI_FILE): oui_available = True
+    oui.parse_custom_oui_file(config.CUSTOM_OUI_FILE)
+    if not oui_available and not oui.custom_oui_dict: logging.warning("WARNING: No OUI data loaded.")
+    elif not oui_available and oui.custom_oui_dict: logging.warning("WARNING: Standard OUI failed, using custom only.")
+
+    # Main logic
+    last_state = db.load_state_from_db(db_connection)
+    current_scan = probes.scan_network(config.NETWORK_RANGE) # ARP Scan
+    if current_scan is None: logging.error("ARP Scan failed."); final_report_state = {}
+    else: final_report_state = db.update_db_and_get_status( db_connection, current_scan, last_state, ports_to_scan_set, do_port_scan_this_run )
+
+    # Print results (uses logging - respects LOG_LEVEL)
+    print_results(final_report_state)
+
+    # Close DB
+    if db_connection:
+        try: # Correctly indented try...except
+            db_connection.close(); logging.info("Database connection closed.")
+        except storage.DB_ERRORS as e: logging.error(f"Error closing DB connection: {e}")
+
+    end_time = datetime.now(); logging.info(f"Scanner script finished in {(end_time - start_time).total_seconds():.2f} seconds.")
+
+if __name__ == "__main__":
+    main()
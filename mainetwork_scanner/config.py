@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Scanner configuration.
+
+Module globals hold the defaults; load() reads .env / the environment and
+overwrites them. Nothing is read at import time, so core modules can be
+imported by the web app or tooling without side effects.
+"""
+
+# === Imports ===
+import os
+import logging
+from dotenv import load_dotenv
+from . import storage
+
+# === Global Configuration (defaults, overwritten by load()) ===
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_LEVEL_NAME = 'INFO'; LOG_LEVEL = logging.INFO
+# --- Network & OUI ---
+NETWORK_RANGE = None
+OUI_FILE = "oui.txt"
+OUI_URL = "https://standards-oui.ieee.org/oui/oui.txt"
+CUSTOM_OUI_FILE = "custom_oui.txt"
+SCAN_TIMEOUT = 2; PING_TIMEOUT = 1; PING_RETRY = 1
+# --- Port Scan Settings ---
+PORT_SCAN_ENABLED = False
+PORT_SCAN_RANGE_STR = "1-1024"
+PORT_SCAN_TIMEOUT = 0.5
+PORT_SCAN_THREADS = 20
+SCAN_PORT_INTERVAL_SECONDS = 300
+PORT_SCAN_STATE_FILE = os.path.join(PROJECT_DIR, "last_port_scan.ts")
+# --- Scan Pipeline Settings ---
+PIPELINE_PROBE_WORKERS = 4  # Hosts port-scanned concurrently (each uses PORT_SCAN_THREADS sockets)
+PIPELINE_PING_WORKERS = 1   # Concurrent pings for hosts missing from the ARP scan
+PIPELINE_QUEUE_SIZE = 32    # Max items buffered between stages (back-pressure)
+# --- History Purge Setting ---
+PURGE_HISTORY_HOURS = 72
+# --- Profiling Settings ---
+PROFILE_ENABLED = False
+PROFILE_THRESHOLD_SECONDS = 60.0  # Keep only profiles of cycles at least this slow
+PROFILE_DIR = os.path.join(PROJECT_DIR, "profiles")
+PROFILE_KEEP = 10                 # Newest profiles kept per label (rotation)
+WEB_PROFILE_ENABLED = False       # Web app: profile requests (keep the slow ones)
+WEB_PROFILE_THRESHOLD_SECONDS = 1.0
+# --- Event Outbox / Notification Settings ---
+OUTBOX_ENABLED = False           # Scanner writes new_host / state_change events to event_outbox
+NOTIFY_EVENTS = {"new_host", "state_change"}
+NOTIFY_WEBHOOK_URL = None; NOTIFY_WEBHOOK_TIMEOUT = 10.0
+NOTIFY_SYSLOG_ADDRESS = None     # '/dev/log' or 'host:port' (UDP)
+NOTIFY_SMTP_HOST = None; NOTIFY_SMTP_PORT = 25; NOTIFY_SMTP_USER = None; NOTIFY_SMTP_PASSWORD = None
+NOTIFY_SMTP_FROM = None; NOTIFY_SMTP_TO = []; NOTIFY_SMTP_STARTTLS = False
+DISPATCH_POLL_SECONDS = 5.0
+DISPATCH_BATCH_SIZE = 50
+DISPATCH_MAX_ATTEMPTS = 8        # Deliveries tried before an event is marked FAILED
+DISPATCH_RETRY_BASE_SECONDS = 30 # Backoff: base * 2^attempts, capped at 1 hour
+DISPATCH_RATE_PER_MINUTE = 30    # Max deliveries (batches) per sink per minute
+# --- Database Backend & Credentials ---
+DB_BACKEND = storage.BACKEND_MARIADB
+SQLITE_PATH = os.path.join(PROJECT_DIR, "network_scan.db")
+DB_HOST = "localhost"; DB_PORT = 3306; DB_USER = None; DB_PASSWORD = None; DB_NAME = None
+
+# === Loader ===
+def load(env_file=None):
+    """Loads .env (project dir by default) and parses the scanner settings into this module."""
+    global LOG_LEVEL_NAME, LOG_LEVEL, NETWORK_RANGE, OUI_FILE, CUSTOM_OUI_FILE
+    global PORT_SCAN_ENABLED, PORT_SCAN_RANGE_STR, PORT_SCAN_TIMEOUT, PORT_SCAN_THREADS, SCAN_PORT_INTERVAL_SECONDS
+    global PIPELINE_PROBE_WORKERS, PIPELINE_PING_WORKERS, PIPELINE_QUEUE_SIZE
+    global PROFILE_ENABLED, PROFILE_THRESHOLD_SECONDS, PROFILE_DIR, PROFILE_KEEP, WEB_PROFILE_ENABLED, WEB_PROFILE_THRESHOLD_SECONDS
+    global OUTBOX_ENABLED, NOTIFY_EVENTS, NOTIFY_WEBHOOK_URL, NOTIFY_WEBHOOK_TIMEOUT, NOTIFY_SYSLOG_ADDRESS
+    global NOTIFY_SMTP_HOST, NOTIFY_SMTP_PORT, NOTIFY_SMTP_USER, NOTIFY_SMTP_PASSWORD, NOTIFY_SMTP_FROM, NOTIFY_SMTP_TO, NOTIFY_SMTP_STARTTLS
+    global DISPATCH_POLL_SECONDS, DISPATCH_BATCH_SIZE, DISPATCH_MAX_ATTEMPTS, DISPATCH_RETRY_BASE_SECONDS, DISPATCH_RATE_PER_MINUTE
+    global PURGE_HISTORY_HOURS, DB_BACKEND, SQLITE_PATH, DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+    load_dotenv(env_file or os.path.join(PROJECT_DIR, ".env"))
+    # --- Logging Level ---
+    LOG_LEVEL_NAME = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVEL = getattr(logging, LOG_LEVEL_NAME, logging.INFO)
+    # --- Network & OUI ---
+    NETWORK_RANGE = os.getenv("NETWORK_RANGE")
+    OUI_FILE = os.getenv("OUI_FILE", "oui.txt")
+    CUSTOM_OUI_FILE = os.getenv("CUSTOM_OUI_FILE", "custom_oui.txt")
+    # --- Port Scan Settings ---
+    raw_port_scan_enabled = os.getenv("PORT_SCAN_ENABLED", "false").lower(); PORT_SCAN_ENABLED = raw_port_scan_enabled in ['true', '1', 'yes', 'y']
+    PORT_SCAN_RANGE_STR = os.getenv("PORT_SCAN_RANGE", "1-1024")
+    try: PORT_SCAN_TIMEOUT = float(os.getenv("PORT_SCAN_TIMEOUT", "0.5"))
+    except ValueError: logging.warning("Invalid PORT_SCAN_TIMEOUT, using 0.5s"); PORT_SCAN_TIMEOUT = 0.5
+    try: PORT_SCAN_THREADS = int(os.getenv("PORT_SCAN_THREADS", "20")); assert PORT_SCAN_THREADS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid PORT_SCAN_THREADS, using 20"); PORT_SCAN_THREADS = 20
+    try: SCAN_PORT_INTERVAL_SECONDS = int(os.getenv("SCAN_PORT_INTERVAL_SECONDS", "300")); assert SCAN_PORT_INTERVAL_SECONDS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid SCAN_PORT_INTERVAL_SECONDS, using 300s"); SCAN_PORT_INTERVAL_SECONDS = 300
+    # --- Scan Pipeline Settings ---
+    try: PIPELINE_PROBE_WORKERS = int(os.getenv("PIPELINE_PROBE_WORKERS", "4")); assert PIPELINE_PROBE_WORKERS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid PIPELINE_PROBE_WORKERS, using 4"); PIPELINE_PROBE_WORKERS = 4
+    try: PIPELINE_PING_WORKERS = int(os.getenv("PIPELINE_PING_WORKERS", "1")); assert PIPELINE_PING_WORKERS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid PIPELINE_PING_WORKERS, using 1"); PIPELINE_PING_WORKERS = 1
+    try: PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32")); assert PIPELINE_QUEUE_SIZE > 0
+    except (ValueError, AssertionError): logging.warning("Invalid PIPELINE_QUEUE_SIZE, using 32"); PIPELINE_QUEUE_SIZE = 32
+    # --- History Purge Setting ---
+    try: PURGE_HISTORY_HOURS = int(os.getenv("PURGE_HISTORY_HOURS", "72"))
+    except ValueError: logging.warning("Invalid PURGE_HISTORY_HOURS, using 72"); PURGE_HISTORY_HOURS = 72
+    # --- Profiling Settings ---
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() in ['true', '1', 'yes', 'y']
+    try: PROFILE_THRESHOLD_SECONDS = float(os.getenv("PROFILE_THRESHOLD_SECONDS", "60"))
+    except ValueError: logging.warning("Invalid PROFILE_THRESHOLD_SECONDS, using 60s"); PROFILE_THRESHOLD_SECONDS = 60.0
+    PROFILE_DIR = os.path.join(PROJECT_DIR, os.getenv("PROFILE_DIR", "profiles"))
+    try: PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "10")); assert PROFILE_KEEP > 0
+    except (ValueError, AssertionError): logging.warning("Invalid PROFILE_KEEP, using 10"); PROFILE_KEEP = 10
+    WEB_PROFILE_ENABLED = os.getenv("WEB_PROFILE_ENABLED", "false").lower() in ['true', '1', 'yes', 'y']
+    try: WEB_PROFILE_THRESHOLD_SECONDS = float(os.getenv("WEB_PROFILE_THRESHOLD_SECONDS", "1.0"))
+    except ValueError: logging.warning("Invalid WEB_PROFILE_THRESHOLD_SECONDS, using 1.0s"); WEB_PROFILE_THRESHOLD_SECONDS = 1.0
+    # --- Event Outbox / Notification Settings ---
+    OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "false").lower() in ['true', '1', 'yes', 'y']
+    NOTIFY_EVENTS = {e.strip() for e in os.getenv("NOTIFY_EVENTS", "new_host,state_change").split(',') if e.strip()}
+    NOTIFY_WEBHOOK_URL = os.getenv("NOTIFY_WEBHOOK_URL") or None
+    try: NOTIFY_WEBHOOK_TIMEOUT = float(os.getenv("NOTIFY_WEBHOOK_TIMEOUT", "10"))
+    except ValueError: logging.warning("Invalid NOTIFY_WEBHOOK_TIMEOUT, using 10s"); NOTIFY_WEBHOOK_TIMEOUT = 10.0
+    NOTIFY_SYSLOG_ADDRESS = os.getenv("NOTIFY_SYSLOG_ADDRESS") or None
+    NOTIFY_SMTP_HOST = os.getenv("NOTIFY_SMTP_HOST") or None
+    try: NOTIFY_SMTP_PORT = int(os.getenv("NOTIFY_SMTP_PORT", "25"))
+    except ValueError: logging.warning("Invalid NOTIFY_SMTP_PORT, using 25"); NOTIFY_SMTP_PORT = 25
+    NOTIFY_SMTP_USER = os.getenv("NOTIFY_SMTP_USER") or None; NOTIFY_SMTP_PASSWORD = os.getenv("NOTIFY_SMTP_PASSWORD") or None
+    NOTIFY_SMTP_FROM = os.getenv("NOTIFY_SMTP_FROM") or None
+    NOTIFY_SMTP_TO = [a.strip() for a in os.getenv("NOTIFY_SMTP_TO", "").split(',') if a.strip()]
+    NOTIFY_SMTP_STARTTLS = os.getenv("NOTIFY_SMTP_STARTTLS", "false").lower() in ['true', '1', 'yes', 'y']
+    try: DISPATCH_POLL_SECONDS = float(os.getenv("DISPATCH_POLL_SECONDS", "5")); assert DISPATCH_POLL_SECONDS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid DISPATCH_POLL_SECONDS, using 5s"); DISPATCH_POLL_SECONDS = 5.0
+    try: DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "50")); assert DISPATCH_BATCH_SIZE > 0
+    except (ValueError, AssertionError): logging.warning("Invalid DISPATCH_BATCH_SIZE, using 50"); DISPATCH_BATCH_SIZE = 50
+    try: DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "8")); assert DISPATCH_MAX_ATTEMPTS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid DISPATCH_MAX_ATTEMPTS, using 8"); DISPATCH_MAX_ATTEMPTS = 8
+    try: DISPATCH_RETRY_BASE_SECONDS = int(os.getenv("DISPATCH_RETRY_BASE_SECONDS", "30")); assert DISPATCH_RETRY_BASE_SECONDS > 0
+    except (ValueError, AssertionError): logging.warning("Invalid DISPATCH_RETRY_BASE_SECONDS, using 30s"); DISPATCH_RETRY_BASE_SECONDS = 30
+    try: DISPATCH_RATE_PER_MINUTE = int(os.getenv("DISPATCH_RATE_PER_MINUTE", "30")); assert DISPATCH_RATE_PER_MINUTE > 0
+    except (ValueError, AssertionError): logging.warning("Invalid DISPATCH_RATE_PER_MINUTE, using 30"); DISPATCH_RATE_PER_MINUTE = 30
+    # --- Database Backend & Credentials ---
+    DB_BACKEND = storage.normalize_backend(os.getenv("DB_BACKEND", storage.BACKEND_MARIADB))
+    SQLITE_PATH = os.path.join(PROJECT_DIR, os.getenv("SQLITE_PATH", "network_scan.db"))
+    DB_HOST = os.getenv("DB_HOST", "localhost"); DB_PORT = int(os.getenv("DB_PORT", 3306)); DB_USER = os.getenv("DB_USER"); DB_PASSWORD = os.getenv("DB_PASSWORD"); DB_NAME = os.getenv("DB_NAME")
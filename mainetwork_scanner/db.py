@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+"""Scanner database state: load previous state, apply a scan cycle, purge old history."""
+
+# === Imports ===
+import queue, logging, threading
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from . import config, oui, outbox, pipeline, ports, probes, storage
+
+# === Connection ===
+def connect_db():
+    if config.DB_BACKEND == storage.BACKEND_MARIADB and not all([config.DB_USER, config.DB_PASSWORD, config.DB_NAME]): logging.error("ERROR: DB credentials missing."); return None
+    try: return storage.connect(config.DB_BACKEND, host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER, password=config.DB_PASSWORD, database=config.DB_NAME, sqlite_path=config.SQLITE_PATH, timeout=10)
+    except (*storage.DB_ERRORS, RuntimeError) as e: logging.error(f"ERROR: DB connection failed ({config.DB_BACKEND}): {e}"); return None
+
+# === Database State Functions ===
+# Function load_state_from_db (Syntax Corrected)
+def load_state_from_db(conn):
+    last_db_state = {}; cursor = None
+    if not conn: return last_db_state
+    logging.info("Loading previous state from DB...");
+    try:
+        cursor = conn.cursor(dictionary=True)
+        query = "SELECT ip_address, mac_address, vendor, hostname, ports, note, status, known_host, last_seen_online FROM hosts"
+        cursor.execute(query); results = cursor.fetchall()
+        for row in results:
+            ip = row['ip_address']; last_db_state[ip] = row
+            # Corrected known_host handling
+            try:
+                if last_db_state[ip]['known_host'] is not None:
+                    last_db_state[ip]['known_host'] = int(last_db_state[ip]['known_host'])
+                else: last_db_state[ip]['known_host'] = 0
+            except (ValueError, TypeError):
+                 last_db_state[ip]['known_host'] = 0
+        # Log count *after* the loop
+        logging.info(f"Loaded state for {len(last_db_state)} hosts.")
+    except storage.DB_ERRORS as e: logging.error(f"ERROR reading DB state: {e}")
+    except Exception as e: logging.error(f"ERROR loading DB state: {e}")
+    finally:
+        if cursor: cursor.close()
+    return last_db_state
+
+# Function update_db_and_get_status (MODIFIED to use UTC for history, PIPELINED stages)
+# The cycle runs as queue-connected stages (see pipeline.py):
+#   discover -> enrich (vendor) -> probe (port scan) -> persist
+#   discover -> ping (hosts missing from ARP)        -> persist
+# Persist runs in the calling thread (the only user of the DB connection): results of early hosts
+# are processed while later ones are probed, and their writes are buffered, then applied in one
+# short transaction at the end (begin_write: on SQLite the database-wide write lock is only held
+# for that flush, not during the port scans, so web edits are not blocked by a running cycle).
+# With OUTBOX_ENABLED, new_host / state_change events are queued in event_outbox in the same
+# transaction (delivered later by dispatcher.py, never from the scan cycle).
+def update_db_and_get_status(conn, current_scan_results, last_db_state, ports_to_scan, perform_port_scan):
+    final_report_state = OrderedDict(); updated_count, inserted_count, offline_count, port_scan_count, ping_check_count, history_count = 0, 0, 0, 0, 0, 0
+    if not conn: logging.error("ERROR: Invalid DB connection for update."); return final_report_state
+    cursor = None
+    # Use UTC for the 'now' timestamp for consistent history events
+    now_ts_utc = datetime.now(timezone.utc) # Get current time in UTC
+    now_ts_for_report = datetime.now() # Use local time just for the final report dictionary (less critical)
+    port_scan_active = bool(config.PORT_SCAN_ENABLED and perform_port_scan and ports_to_scan)
+    probe_workers = config.PIPELINE_PROBE_WORKERS if port_scan_active else 1
+    ping_workers = config.PIPELINE_PING_WORKERS
+    stop_event = threading.Event(); stage_errors = []; stage_threads = []
+
+    # --- Stage functions (worker threads, no DB access) ---
+    def enrich(item):
+        ip, mac = item
+        return (ip, mac, oui.get_vendor(mac))
+
+    def probe(item):
+        ip, mac, vendor = item; ports_result_str = None
+        if port_scan_active:
+            logging.info(f"Starting port scan for {ip} ({len(ports_to_scan)} ports)..."); ports_result_str = ports.scan_ports_threaded(ip, ports_to_scan, config.PORT_SCAN_TIMEOUT, config.PORT_SCAN_THREADS)
+            if ports_result_str is not None: logging.info(f"Port scan {ip} -> '{ports_result_str or 'None Open'}'")
+        return ('online', ip, mac, vendor, ports_result_str)
+
+    def ping(ip):
+        logging.debug(f"Pinging {ip}...")
+        return ('ping', ip, probes.is_host_reachable_by_ping(ip))
+
+    # --- Persist stage (calling thread, owns the cursor) ---
+    def persist_online(ip, mac, vendor, ports_result_str):
+        nonlocal updated_count, inserted_count, port_scan_count
+        if port_scan_active and ports_result_str is not None: port_scan_count += 1
+        last_state = last_db_state.get(ip)
+        current_ports = ports_result_str if ports_result_str is not None else (last_state.get('ports', '') if last_state else '')
+        # Populate final report state using local time for its 'timestamp' field
+        final_report_state[ip] = {'mac': mac, 'vendor': vendor, 'status': 'ONLINE', 'ports': current_ports or "", 'hostname': last_state.get('hostname', '') if last_state else '', 'note': last_state.get('note', '') if last_state else '', 'known_host': last_state.get('known_host', 0) if last_state else 0, 'timestamp': now_ts_for_report}
+
+        if last_state: # UPDATE
+            last_mac=last_state.get('mac','') or ''; last_vendor=last_state.get('vendor','') or ''; last_status=last_state.get('status','OFFLINE'); last_ports=last_state.get('ports','') or ''
+            current_ports_compare = ports_result_str if ports_result_str is not None else last_ports
+            port_scan_rel = port_scan_active and ports_result_str is not None
+            ports_differ = (port_scan_rel and (current_ports_compare or "") != (last_ports or ""))
+            status_changed = (last_status == 'OFFLINE')
+            needs_update = (status_changed or last_mac != mac or last_vendor != vendor or ports_differ)
+
+            if needs_update:
+                # Update last_seen_online using the database's NOW() which *should* be UTC if configured correctly,
+                # or at least consistent with how event_time is stored.
+                set_clauses = ["mac_address = ?", "vendor = ?", "status = 'ONLINE'", "last_seen_online = NOW()"]
+                params = [mac, vendor]
+                if port_scan_rel: set_clauses.append("ports = ?"); params.append(ports_result_str if ports_result_str else None);
+                if status_changed:
+                    # Add history event using the explicit UTC timestamp
+                    history_inserts.append((ip, 1, now_ts_utc))
+                    logging.debug(f"DB HISTORY Queued: {ip} -> ONLINE at {now_ts_utc}")
+                    outbox_events.append(outbox.make_event(outbox.EVENT_STATE_CHANGE, ip, now_ts_utc, status='ONLINE', mac=mac, vendor=vendor, hostname=last_state.get('hostname') or '', known_host=last_state.get('known_host', 0)))
+                params.append(ip); update_query = f"UPDATE hosts SET {', '.join(set_clauses)} WHERE ip_address = ?"; host_writes.append((update_query, tuple(params))); updated_count += 1
+        else: # INSERT
+            current_ports_insert = ports_result_str if (port_scan_active and ports_result_str is not None) else None
+            logging.info(f"DB INSERT: {ip} (MAC: {mac}, Ports: '{current_ports_insert or 'NULL'}')")
+            # Use DB NOW() for first_seen and last_seen_online
+            insert_query = "INSERT INTO hosts (ip_address, mac_address, vendor, ports, status, first_seen, last_seen_online) VALUES (?, ?, ?, ?, 'ONLINE', NOW(), NOW())"; host_writes.append((insert_query, (ip, mac, vendor, current_ports_insert))); inserted_count += 1
+            # Add history event using explicit UTC timestamp
+            history_inserts.append((ip, 1, now_ts_utc)); logging.debug(f"DB HISTORY Queued: {ip} -> ONLINE (New) at {now_ts_utc}")
+            outbox_events.append(outbox.make_event(outbox.EVENT_NEW_HOST, ip, now_ts_utc, status='ONLINE', mac=mac, vendor=vendor, hostname='', known_host=0))
+
+    def persist_ping(ip, reachable):
+        nonlocal offline_count, ping_check_count
+        ping_check_count += 1; last_data = last_db_state[ip]
+        if reachable:
+            logging.info(f"Ping success for {ip}. Kept as ONLINE.")
+            final_report_state[ip] = {**last_data, 'status': 'ONLINE', 'timestamp': now_ts_for_report}
+        else:
+            logging.info(f"Ping failed for {ip}. Marking OFFLINE.")
+            host_writes.append(("UPDATE hosts SET status = 'OFFLINE' WHERE ip_address = ?", (ip,))); offline_count += 1
+            final_report_state[ip] = {**last_data, 'status': 'OFFLINE', 'timestamp': now_ts_for_report}
+            # Add history event using explicit UTC timestamp
+            history_inserts.append((ip, 0, now_ts_utc)); logging.debug(f"DB HISTORY Queued: {ip} -> OFFLINE at {now_ts_utc}")
+            outbox_events.append(outbox.make_event(outbox.EVENT_STATE_CHANGE, ip, now_ts_utc, status='OFFLINE', mac=last_data.get('mac_address') or '', vendor=last_data.get('vendor') or '', hostname=last_data.get('hostname') or '', known_host=last_data.get('known_host', 0)))
+
+    def persist(item):
+        if item[0] == 'online': persist_online(*item[1:])
+        else: persist_ping(*item[1:])
+
+    host_writes = []; history_inserts = []; outbox_events = []
+    try:
+        cursor = conn.cursor(); online_ips = set(current_scan_results.keys())
+        potentially_offline_ips = set(last_db_state.keys()) - online_ips
+        ips_to_ping = [ip for ip in potentially_offline_ips if last_db_state[ip].get('status') == 'ONLINE']
+        if potentially_offline_ips: logging.info(f"{len(potentially_offline_ips)} hosts not in ARP. Pinging...");
+
+        # Start stages (bounded queues give back-pressure between them)
+        enrich_q, probe_q, ping_q, persist_q = (queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE) for _ in range(4))
+        stage_threads += pipeline.start_source("discover-online", ((ip, current_scan_results[ip]['mac']) for ip in online_ips), enrich_q, stop_event, stage_errors)
+        stage_threads += pipeline.start_stage("enrich", enrich, enrich_q, probe_q, stop_event, stage_errors, out_consumers=probe_workers)
+        stage_threads += pipeline.start_stage("probe", probe, probe_q, persist_q, stop_event, stage_errors, workers=probe_workers)
+        stage_threads += pipeline.start_source("discover-offline", ips_to_ping, ping_q, stop_event, stage_errors, out_consumers=ping_workers)
+        stage_threads += pipeline.start_stage("ping", ping, ping_q, persist_q, stop_event, stage_errors, workers=ping_workers)
+        # Persist: 2 producers feed persist_q (probe and ping stages)
+        pipeline.consume(persist_q, persist, stop_event, stage_errors, producers=2)
+
+        # Already OFFLINE hosts: nothing to probe or write
+        for ip in potentially_offline_ips:
+            if ip not in final_report_state: final_report_state[ip] = {**last_db_state[ip], 'timestamp': now_ts_for_report}
+
+        # Apply Host Writes (single short write transaction)
+        storage.begin_write(conn)
+        for write_query, write_params in host_writes: cursor.execute(write_query, write_params)
+
+        # Insert History Records
+        if history_inserts:
+            logging.info(f"Inserting {len(history_inserts)} history records...")
+            history_query = "INSERT INTO host_history (ip_address, status, event_time) VALUES (?, ?, ?)"
+            try:
+                # Pass the datetime objects directly (the DB driver / storage adapter handles conversion)
+                cursor.executemany(history_query, history_inserts)
+                history_count = cursor.rowcount; logging.info(f"Inserted {history_count} history records.")
+            except storage.DB_ERRORS as hist_e: logging.error(f"ERROR: Failed to insert history: {hist_e}")
+
+        # Queue Notification Events (same transaction as the host changes: a failure rolls back the cycle)
+        if config.OUTBOX_ENABLED and outbox_events:
+            outbox_count = outbox.write_events(cursor, outbox_events); logging.info(f"Queued {outbox_count} notification events in outbox.")
+
+        # Commit
+        conn.commit(); logging.info(f"\nDB update complete: {inserted_count} IN, {updated_count} UP, {offline_count} OFF.")
+        if ping_check_count > 0: logging.info(f"Ping checks performed for {ping_check_count} hosts.")
+        if port_scan_count > 0: logging.info(f"Port scans performed for {port_scan_count} online hosts.")
+        if history_count > 0: logging.info(f"Status change history events recorded: {history_count}")
+    except storage.DB_ERRORS as e: logging.error(f"ERROR during DB update: {e}"); logging.warning("Rolling back DB changes..."); conn.rollback(); final_report_state = {ip: {**d, 'status': d['status'] + " (DB Fail)"} for ip, d in final_report_state.items()}
+    except Exception as e: logging.exception(f"ERROR during DB update: {e}"); logging.warning("Rolling back DB changes..."); conn.rollback(); final_report_state = {ip: {**d, 'status': d['status'] + " (DB Fail)"} for ip, d in final_report_state.items()}
+    finally:
+        pipeline.stop_and_join(stage_threads, stop_event)
+        if cursor: cursor.close()
+    return final_report_state
+
+# --- History Purge Function ---
+# --- History Purge Function (REVISED to Keep Last Event) ---
+def purge_old_history(conn, hours_to_keep):
+    """
+    Deletes records older than specified hours from host_history table,
+    BUT KEEPS the most recent record for each host.
+    """
+    if not conn or hours_to_keep <= 0:
+        if hours_to_keep <= 0:
+            logging.info("History purge disabled (PURGE_HISTORY_HOURS <= 0).")
+        return
+
+    logging.info(f"Purging history records older than {hours_to_keep} hours (keeping latest per host)...")
+    cursor = None
+    try:
+        # Calculate the cutoff date (using UTC for safety)
+        cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours_to_keep)
+
+        cursor = conn.cursor()
+
+        # Step 1: Find the maximum ID for each ip_address.
+        # We use MAX(id) assuming 'id' is an auto-incrementing primary key,
+        # which reliably represents the latest entry per group.
+        # If using event_time, timezone issues could be complex if not strictly UTC.
+        find_latest_ids_query = """
+            SELECT MAX(id)
+            FROM host_history
+            GROUP BY ip_address
+        """
+        cursor.execute(find_latest_ids_query)
+        latest_ids = {row[0] for row in cursor.fetchall()} # Set of latest IDs to keep
+
+        # Step 2: Delete rows older than the cutoff date AND whose ID is NOT in the set of latest IDs.
+        # Using placeholders for safety.
+        # We need to construct the NOT IN part dynamically if the set is large,
+        # but for a reasonable number of hosts, this is okay.
+        # However, passing a large set via parameter binding can be inefficient or problematic.
+        # A JOIN approach is often better for performance and scalability.
+
+        # --- OPTION 1: Using NOT IN (Simpler but potentially slow with many hosts) ---
+        # if latest_ids:
+        #     # Create placeholders for the NOT IN clause
+        #     placeholders = ', '.join(['?'] * len(latest_ids))
+        #     purge_query = f"DELETE FROM host_history WHERE event_time < ? AND id NOT IN ({placeholders})"
+        #     params = [cutoff_date] + list(latest_ids)
+        #     cursor.execute(purge_query, tuple(params))
+        # else:
+        #     # If there are no latest IDs (empty table?), just delete old ones
+        #     purge_query = "DELETE FROM host_history WHERE event_time < ?"
+        #     cursor.execute(purge_query, (cutoff_date,))
+
+        # --- OPTION 2: Using LEFT JOIN on MariaDB, NOT IN subquery on SQLite (see storage.py) ---
+        purge_query = storage.purge_history_query(config.DB_BACKEND)
+        cursor.execute(purge_query, (cutoff_date,))
+        # --- END OPTION 2 ---
+
+        deleted_count = cursor.rowcount
+        conn.commit() # Commit the deletion
+        logging.info(f"History purge complete. Deleted {deleted_count} old records (latest per host retained).")
+
+    except storage.DB_ERRORS as e:
+        logging.error(f"ERROR: Failed to purge history: {e}")
+        if conn: conn.rollback() # Rollback on error
+    except Exception as e:
+        logging.exception(f"ERROR: Unexpected error during history purge: {e}")
+        if conn: conn.rollback()
+    finally:
+        if cursor:
+            cursor.close()
+
+# --- Vendor Reclassification (OUI changes) ---
+RECLASSIFY_PREFIX_BATCH = 100 # Prefix ranges per SELECT
+
+def mac_prefix_range(oui_prefix):
+    """
+    [start, end) range of mac_address values ('aa:bb:cc:dd:ee:ff' as stored by the scanner)
+    starting with the OUI prefix, so lookups can use the idx_mac_address index.
+    """
+    prefix = ':'.join(oui_prefix[i:i + 2] for i in range(0, 6, 2)).lower() + ':'
+    return prefix, prefix[:-1] + ';' # ';' sorts right after ':'
+
+def find_hosts_by_mac_prefix(conn, oui_prefixes):
+    """Returns [{'ip_address', 'mac_address', 'vendor'}] for hosts (online or offline) under the prefixes."""
+    hosts = []; prefixes = sorted(oui_prefixes); cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        for i in range(0, len(prefixes), RECLASSIFY_PREFIX_BATCH):
+            batch = prefixes[i:i + RECLASSIFY_PREFIX_BATCH]; params = []
+            for oui_prefix in batch: params.extend(mac_prefix_range(oui_prefix))
+            where = " OR ".join(["(mac_address >= ? AND mac_address < ?)"] * len(batch))
+            cursor.execute(f"SELECT ip_address, mac_address, vendor FROM hosts WHERE {where}", tuple(params))
+            hosts.extend(cursor.fetchall())
+    finally:
+        if cursor: cursor.close()
+    return hosts
+
+def reclassify_vendors(conn, changed_prefixes, custom_map, standard_map, apply=True):
+    """
+    Re-vendors only the hosts whose MAC prefix changed in the OUI sources, in one bulk UPDATE
+    committed as a single transaction. With apply=False nothing is written (preview).
+    Returns the number of hosts whose vendor changes (raises DB_ERRORS on failure).
+    """
+    if not conn or not changed_prefixes: return 0
+    updates = []
+    for host in find_hosts_by_mac_prefix(conn, changed_prefixes):
+        oui_prefix = (host['mac_address'] or '').replace(':', '').replace('-', '').upper()[:6]
+        new_vendor = oui.vendor_for_prefix(oui_prefix, custom_map, standard_map)
+        if new_vendor != (host['vendor'] or ''): updates.append((new_vendor, host['ip_address']))
+    if not apply or not updates: return len(updates)
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE hosts SET vendor = ? WHERE ip_address = ?", updates)
+        conn.commit(); logging.info(f"DB VENDOR RECLASSIFY: {len(updates)} hosts updated for {len(changed_prefixes)} changed OUI prefixes.")
+    except storage.DB_ERRORS:
+        conn.rollback(); raise
+    finally:
+        if cursor: cursor.close()
+    return len(updates)
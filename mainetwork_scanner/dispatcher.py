@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Asynchronous notification dispatcher for the event outbox.
+
+Runs as its own process (python -m mainetwork_scanner.dispatcher), never inside
+the scan cycle: it polls PENDING events, dedupes them per (event, host), and
+delivers each batch concurrently to the configured sinks (webhook, syslog, SMTP)
+with a per-sink rate limit. Failed batches are retried with exponential backoff
+until DISPATCH_MAX_ATTEMPTS; each event remembers the sinks that already
+received it, so a retry only goes to the sinks that failed. Processed events older than
+PURGE_HISTORY_HOURS are deleted hourly. Without any sink configured the
+service keeps running and marks due events SKIPPED, so the outbox stays bounded.
+"""
+
+# === Imports ===
+import sys, json, time, socket, asyncio, logging, argparse, smtplib
+import logging.handlers
+import urllib.request
+from email.message import EmailMessage
+from datetime import timedelta
+from . import config, db, outbox, storage
+
+# === Constants ===
+PURGE_INTERVAL_SECONDS = 3600 # How often processed events are purged
+
+# === Sinks (blocking send, run in worker threads) ===
+class WebhookSink:
+    """POSTs {"events": [...]} as JSON; any non-2xx answer is a failure."""
+    name = "webhook"
+
+    def __init__(self, url, timeout):
+        self.url = url; self.timeout = timeout
+
+    def send(self, events):
+        body = json.dumps({"events": events}).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, method='POST', headers={'Content-Type': 'application/json', 'User-Agent': 'mainetwork-scanner'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300: raise RuntimeError(f"HTTP {response.status}")
+
+class _RaisingSysLogHandler(logging.handlers.SysLogHandler):
+    def handleError(self, record): raise # Called from emit()'s except block: re-raise for retry
+
+class SyslogSink:
+    """One syslog message per event ('/dev/log' or 'host:port' over UDP)."""
+    name = "syslog"
+
+    def __init__(self, address):
+        if ':' in address and not address.startswith('/'):
+            host, port = address.rsplit(':', 1); address = (host, int(port))
+        self.handler = _RaisingSysLogHandler(address=address, facility=logging.handlers.SysLogHandler.LOG_DAEMON, socktype=socket.SOCK_DGRAM)
+        self.handler.setFormatter(logging.Formatter('mainetwork-scanner: %(message)s'))
+
+    def send(self, events):
+        for event in events:
+            record = logging.LogRecord("mainetwork_scanner.events", logging.WARNING, __file__, 0, json.dumps(event), None, None)
+            self.handler.emit(record)
+
+class SmtpSink:
+    """One e-mail per batch."""
+    name = "smtp"
+
+    def __init__(self, host, port, sender, recipients, user=None, password=None, starttls=False, timeout=30):
+        self.host = host; self.port = port; self.sender = sender; self.recipients = recipients
+        self.user = user; self.password = password; self.starttls = starttls; self.timeout = timeout
+
+    def send(self, events):
+        message = EmailMessage()
+        message['Subject'] = f"[MaiNetwork Scanner] {len(events)} network event(s)"
+        message['From'] = self.sender; message['To'] = ', '.join(self.recipients)
+        lines = [f"{e.get('event_time', '')}  {e.get('event', ''):<13} {e.get('ip_address', ''):<16} {e.get('status', '')} {e.get('mac', '') or ''} {e.get('vendor', '') or ''}" for e in events]
+        message.set_content("\n".join(lines) + "\n")
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls: smtp.starttls()
+            if self.user: smtp.login(self.user, self.password or '')
+            smtp.send_message(message)
+
+def build_sinks():
+    """Creates the sinks configured in .env (NOTIFY_*)."""
+    sinks = []
+    if config.NOTIFY_WEBHOOK_URL: sinks.append(WebhookSink(config.NOTIFY_WEBHOOK_URL, config.NOTIFY_WEBHOOK_TIMEOUT))
+    if config.NOTIFY_SYSLOG_ADDRESS: sinks.append(SyslogSink(config.NOTIFY_SYSLOG_ADDRESS))
+    if config.NOTIFY_SMTP_HOST:
+        if config.NOTIFY_SMTP_FROM and config.NOTIFY_SMTP_TO:
+            sinks.append(SmtpSink(config.NOTIFY_SMTP_HOST, config.NOTIFY_SMTP_PORT, config.NOTIFY_SMTP_FROM, config.NOTIFY_SMTP_TO, config.NOTIFY_SMTP_USER, config.NOTIFY_SMTP_PASSWORD, config.NOTIFY_SMTP_STARTTLS))
+        else: logging.warning("WARNING: NOTIFY_SMTP_HOST set without NOTIFY_SMTP_FROM/NOTIFY_SMTP_TO, SMTP sink disabled.")
+    return sinks
+
+# === Rate Limiting ===
+class RateLimiter:
+    """Token bucket: at most 'rate_per_minute' acquisitions per minute (bursts up to the same amount)."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute); self.tokens = self.capacity
+        self.refill_per_second = rate_per_minute / 60.0; self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second); self.updated = now
+            if self.tokens >= 1: self.tokens -= 1; return
+            await asyncio.sleep((1 - self.tokens) / self.refill_per_second)
+
+# === Dispatch Loop ===
+async def _deliver(sink, limiter, events):
+    await limiter.acquire()
+    await asyncio.to_thread(sink.send, events)
+
+async def dispatch_once(conn, sinks, limiters):
+    """Delivers one batch of due events. Returns the number of events fetched."""
+    rows = outbox.fetch_pending(conn, config.DISPATCH_BATCH_SIZE)
+    if not rows: return 0
+    wanted = [row for row in rows if row['event_type'] in config.NOTIFY_EVENTS]
+    outbox.mark_done(conn, [row['id'] for row in rows if row['event_type'] not in config.NOTIFY_EVENTS], outbox.STATUS_SKIPPED, "event type not in NOTIFY_EVENTS")
+    to_deliver, duplicate_ids = outbox.dedupe(wanted)
+    outbox.mark_done(conn, duplicate_ids, outbox.STATUS_SKIPPED, "superseded by a newer event")
+    if not to_deliver: return len(rows)
+    if not sinks: outbox.mark_done(conn, [row['id'] for row in to_deliver], outbox.STATUS_SKIPPED, "no notification sink configured"); return len(rows)
+
+    # Each sink only gets the events it has not received yet (earlier partial deliveries)
+    delivered = {row['id']: outbox.delivered_sinks(row) for row in to_deliver}
+    pending = {sink.name: [row for row in to_deliver if sink.name not in delivered[row['id']]] for sink in sinks}
+    active_sinks = [sink for sink in sinks if pending[sink.name]]
+    results = await asyncio.gather(*(_deliver(sink, limiters[sink.name], [json.loads(row['payload']) for row in pending[sink.name]]) for sink in active_sinks), return_exceptions=True)
+    errors = []
+    for sink, result in zip(active_sinks, results):
+        if isinstance(result, Exception): errors.append(f"{sink.name}: {result}"); continue
+        logging.info(f"Delivered {len(pending[sink.name])} events to {sink.name}.")
+        for row in pending[sink.name]: delivered[row['id']].add(sink.name)
+
+    sink_names = {sink.name for sink in sinks}
+    done_ids = [row['id'] for row in to_deliver if sink_names <= delivered[row['id']]]
+    retry_rows = [row for row in to_deliver if not sink_names <= delivered[row['id']]]
+    outbox.mark_done(conn, done_ids)
+    if retry_rows:
+        logging.warning(f"WARNING: Delivery of {len(retry_rows)} events failed ({'; '.join(errors)}), retry scheduled for the failed sinks.")
+        outbox.mark_retry(conn, retry_rows, '; '.join(errors), config.DISPATCH_MAX_ATTEMPTS, config.DISPATCH_RETRY_BASE_SECONDS, delivered)
+    return len(rows)
+
+def purge_old_events(conn, hours_to_keep):
+    """Deletes processed (SENT/SKIPPED/FAILED) events older than hours_to_keep (disabled if <= 0)."""
+    if hours_to_keep <= 0: return 0
+    deleted_count = outbox.purge_processed(conn, outbox.utc_now() - timedelta(hours=hours_to_keep))
+    if deleted_count: logging.info(f"Outbox purge: deleted {deleted_count} processed events older than {hours_to_keep} hours.")
+    return deleted_count
+
+async def run(once=False, sinks=None):
+    """Polls the outbox until stopped (or one pass with once=True, until no event is due)."""
+    sinks = build_sinks() if sinks is None else sinks
+    if not sinks: logging.warning("WARNING: No notification sink configured (NOTIFY_*), due events will be marked SKIPPED.")
+    limiters = {sink.name: RateLimiter(config.DISPATCH_RATE_PER_MINUTE) for sink in sinks}
+    conn = None; next_purge = time.monotonic()
+    while True:
+        try:
+            if conn is None: conn = db.connect_db()
+            if conn and time.monotonic() >= next_purge:
+                purge_old_events(conn, config.PURGE_HISTORY_HOURS); next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+            fetched = await dispatch_once(conn, sinks, limiters) if conn else 0
+        except storage.DB_ERRORS as e:
+            logging.error(f"ERROR: Outbox DB error: {e}"); fetched = 0
+            try: conn.close()
+            except Exception: pass
+            conn = None
+        if once and not fetched: break
+        if not fetched: await asyncio.sleep(config.DISPATCH_POLL_SECONDS)
+    if conn: conn.close()
+
+# === Main Execution ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MaiNetwork Scanner: deliver outbox events to webhook/syslog/SMTP.")
+    parser.add_argument("--once", action="store_true", help="Deliver the events currently due, then exit.")
+    args = parser.parse_args(argv)
+    config.load()
+    logging.basicConfig(level=config.LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S', stream=sys.stdout)
+    try: asyncio.run(run(once=args.once))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
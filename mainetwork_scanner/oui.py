@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""OUI (MAC vendor) data: IEEE list download/parsing, custom overrides and vendor lookup."""
+
+# === Imports ===
+import os, logging, subprocess, shutil
+from . import config
+
+# === OUI State (filled by parse_oui_file / parse_custom_oui_file) ===
+oui_dict = {}; custom_oui_dict = {}
+
+# === OUI File Handling ===
+def download_oui_file(url, filename): # Syntax Corrected
+    if not os.path.exists(filename):
+        logging.info(f"Standard OUI file '{filename}' not found. Downloading...")
+        wget_path = shutil.which('wget');
+        if not wget_path: logging.error("ERROR: 'wget' not found."); return False
+        command = [wget_path, '--tries=3', '--timeout=30', '-nv', url, '-O', filename]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, check=False, timeout=45)
+            if result.returncode == 0 and os.path.exists(filename) and os.path.getsize(filename) > 0: logging.info(f"Standard OUI downloaded: {filename}"); return True
+            else:
+                logging.error(f"ERROR: wget failed (code {result.returncode}). Stderr: {result.stderr or '[None]'}")
+                if os.path.exists(filename):
+                    try: os.remove(filename)
+                    except OSError: pass
+                return False
+        except Exception as e:
+            logging.error(f"ERROR: wget execution error: {e}")
+            if os.path.exists(filename):
+                 try: os.remove(filename)
+                 except OSError: pass
+            return False
+    else: return True
+
+def read_oui_file(filename):
+    """Parses the IEEE OUI list into a {prefix: vendor} map (raises on read errors)."""
+    prefix_map = {}
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if '(hex)' in line:
+                parts = line.split('(hex)', 1)
+                if len(parts) == 2:
+                    mac_prefix = parts[0].strip().replace('-', '').upper()
+                    vendor = parts[1].strip()
+                    if len(mac_prefix) == 6: prefix_map[mac_prefix] = vendor
+    return prefix_map
+
+def parse_oui_file(filename): # Syntax Corrected
+    global oui_dict; oui_dict = {}; logging.info(f"Loading standard OUI from '{filename}'...")
+    try: oui_dict = read_oui_file(filename)
+    except FileNotFoundError: logging.error(f"ERROR: Standard OUI file '{filename}' not found."); return False
+    except Exception as e: logging.error(f"ERROR parsing standard OUI: {e}"); return False
+    if not oui_dict: logging.warning("WARNING: No standard OUI data loaded.");
+    logging.info(f"Loaded {len(oui_dict)} standard OUI records.")
+    return True
+
+def parse_custom_oui_lines(lines, filename):
+    """Parses custom OUI lines ('AABBCC Vendor Name', '#' comments). Returns ({prefix: vendor}, loaded_count)."""
+    prefix_map = {}; loaded_count = 0
+    for line_num, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            prefix_str = parts[0].strip(); vendor_name = parts[1].strip(); normalized_prefix = prefix_str.replace(':','').replace('-','').upper()
+            if len(normalized_prefix) == 6:
+                try: int(normalized_prefix, 16); prefix_map[normalized_prefix] = vendor_name; loaded_count += 1
+                except ValueError: logging.warning(f"WARNING: Invalid hex prefix '{prefix_str}' L{line_num} in '{filename}'.")
+            else:
+                if normalized_prefix.endswith('(HEX)'): normalized_prefix = normalized_prefix[:-5].strip().replace('-','').upper()
+                if len(normalized_prefix) == 6:
+                     try: int(normalized_prefix, 16); prefix_map[normalized_prefix] = vendor_name; loaded_count += 1
+                     except ValueError: logging.warning(f"WARNING: Invalid hex prefix '{prefix_str}' L{line_num} in '{filename}'.")
+                else: logging.warning(f"WARNING: Invalid prefix len '{prefix_str}' L{line_num} in '{filename}'.")
+        else: logging.warning(f"WARNING: Invalid format L{line_num} in '{filename}'.")
+    return prefix_map, loaded_count
+
+def parse_custom_oui_file(filename): # Syntax Corrected
+    global custom_oui_dict; custom_oui_dict = {}; full_path = os.path.join(config.PROJECT_DIR, filename)
+    if not os.path.exists(full_path): logging.info(f"INFO: Custom OUI file '{filename}' not found."); return True
+    logging.info(f"Loading custom OUI overrides from '{filename}'...")
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f: custom_oui_dict, loaded_count = parse_custom_oui_lines(f, filename)
+    except IOError as e: logging.error(f"ERROR: Cannot read custom OUI '{filename}': {e}"); return False
+    except Exception as e: logging.error(f"ERROR parsing custom OUI '{filename}': {e}"); return False
+    logging.info(f"Loaded {loaded_count} custom OUI prefix overrides.")
+    return True
+
+# --- OUI Change Detection ---
+def diff_prefix_maps(old_map, new_map):
+    """Returns the prefixes added, removed or re-vendored between two {prefix: vendor} maps."""
+    return {prefix for prefix in old_map.keys() | new_map.keys() if old_map.get(prefix) != new_map.get(prefix)}
+
+def vendor_for_prefix(oui_prefix, custom_map, standard_map):
+    """Vendor for a 6-hex-digit prefix, same precedence as get_vendor (custom, then standard)."""
+    if oui_prefix in custom_map:
+        return custom_map[oui_prefix] + " (Custom)"
+    if oui_prefix in standard_map:
+        return standard_map[oui_prefix]
+    return "Unknown"
+
+# Vendor Lookup Function (Corrected for UnboundLocalError AGAIN)
+def get_vendor(mac_address):
+    """Gets vendor, prioritizing custom OUI prefix, then standard."""
+    if not mac_address:
+        return "N/A"
+    normalized_mac = mac_address.replace(':','').replace('-','').upper()
+    if len(normalized_mac) < 6:
+        return "Unknown (Short MAC)"
+    oui_prefix = normalized_mac[:6] # Get prefix AFTER length check
+    return vendor_for_prefix(oui_prefix, custom_oui_dict, oui_dict)
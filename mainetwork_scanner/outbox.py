@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+Transactional event outbox (event_outbox table).
+
+The scanner queues new_host / state_change events with write_events() on its
+own cursor, so they are committed (or rolled back) together with the history
+events of the cycle. Delivery is done later by mainetwork_scanner.dispatcher,
+which uses the fetch/mark functions below; nothing here does network I/O.
+"""
+
+# === Imports ===
+import json
+from datetime import datetime, timedelta, timezone
+from . import storage
+
+# === Constants ===
+EVENT_NEW_HOST = "new_host"
+EVENT_STATE_CHANGE = "state_change"
+STATUS_PENDING, STATUS_SENT, STATUS_SKIPPED, STATUS_FAILED = "PENDING", "SENT", "SKIPPED", "FAILED"
+MAX_RETRY_DELAY_SECONDS = 3600
+
+def utc_now():
+    """Naive UTC timestamp (stored the same way by both backends)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# === Scanner Side ===
+def make_event(event_type, ip, event_time, **fields):
+    """Builds an outbox row (event_type, ip_address, payload JSON, created_at, next_attempt_at)."""
+    created_at = event_time.astimezone(timezone.utc).replace(tzinfo=None) if event_time.tzinfo else event_time
+    payload = {"event": event_type, "ip_address": ip, "event_time": created_at.isoformat(timespec='seconds') + 'Z', **fields}
+    return (event_type, ip, json.dumps(payload, default=str), created_at, created_at)
+
+def table_exists(conn):
+    """True if the event_outbox table can be queried (checked once per run before enabling the outbox)."""
+    cursor = None
+    try:
+        cursor = conn.cursor(); cursor.execute("SELECT 1 FROM event_outbox LIMIT 1"); cursor.fetchall()
+        return True
+    except storage.DB_ERRORS:
+        conn.rollback(); return False
+    finally:
+        if cursor: cursor.close()
+
+def write_events(cursor, events):
+    """Queues events on the caller's cursor (no commit: part of the caller's transaction)."""
+    if not events: return 0
+    cursor.executemany("INSERT INTO event_outbox (event_type, ip_address, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)", events)
+    return len(events)
+
+# === Dispatcher Side ===
+def fetch_pending(conn, limit):
+    """Returns up to 'limit' PENDING events due for delivery, oldest first."""
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, event_type, ip_address, payload, attempts, delivered_sinks FROM event_outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?", (STATUS_PENDING, utc_now(), limit))
+        return cursor.fetchall()
+    finally:
+        if cursor: cursor.close()
+
+def dedupe(rows):
+    """Keeps the newest event per (event_type, ip_address). Returns (to_deliver, duplicate_ids)."""
+    newest = {}
+    for row in rows: newest[(row['event_type'], row['ip_address'])] = row # rows are ordered by id
+    keep_ids = {row['id'] for row in newest.values()}
+    return [row for row in rows if row['id'] in keep_ids], [row['id'] for row in rows if row['id'] not in keep_ids]
+
+def delivered_sinks(row):
+    """Names of the sinks that already received the event (set)."""
+    return {name for name in (row.get('delivered_sinks') or '').split(',') if name}
+
+def _update_many(conn, query, params):
+    cursor = None
+    try:
+        cursor = conn.cursor(); cursor.executemany(query, params); conn.commit()
+    except Exception:
+        conn.rollback(); raise
+    finally:
+        if cursor: cursor.close()
+
+def mark_done(conn, ids, status=STATUS_SENT, note=None):
+    """Marks events as SENT (or SKIPPED) in one transaction."""
+    if not ids: return
+    now_ts = utc_now()
+    _update_many(conn, "UPDATE event_outbox SET status = ?, dispatched_at = ?, last_error = ? WHERE id = ?", [(status, now_ts, note, event_id) for event_id in ids])
+
+def purge_processed(conn, older_than):
+    """Deletes SENT/SKIPPED/FAILED events created before 'older_than' (PENDING ones are kept). Returns the count."""
+    cursor = None
+    try:
+        cursor = conn.cursor(); cursor.execute("DELETE FROM event_outbox WHERE status <> ? AND created_at < ?", (STATUS_PENDING, older_than))
+        deleted_count = cursor.rowcount; conn.commit()
+        return deleted_count
+    except Exception:
+        conn.rollback(); raise
+    finally:
+        if cursor: cursor.close()
+
+def mark_retry(conn, rows, error, max_attempts, base_delay_seconds, delivered=None):
+    """
+    Schedules a retry with exponential backoff, or marks FAILED after max_attempts.
+    'delivered' maps event id -> sink names that received it, skipped on the retry.
+    """
+    if not rows: return
+    now_ts = utc_now(); params = []; delivered = delivered or {}
+    for row in rows:
+        sink_names = delivered.get(row['id'], delivered_sinks(row))
+        attempts = int(row['attempts'] or 0) + 1
+        delay = min(base_delay_seconds * (2 ** (attempts - 1)), MAX_RETRY_DELAY_SECONDS)
+        status = STATUS_FAILED if attempts >= max_attempts else STATUS_PENDING
+        params.append((status, attempts, now_ts + timedelta(seconds=delay), ','.join(sorted(sink_names)) or None, str(error)[:1000], row['id']))
+    _update_many(conn, "UPDATE event_outbox SET status = ?, attempts = ?, next_attempt_at = ?, delivered_sinks = ?, last_error = ? WHERE id = ?", params)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+Minimal queue-connected stage pipeline used by the scan cycle.
+
+Stages run in worker threads and are connected by bounded queues, so a
+slow stage applies back-pressure on the ones before it while every stage
+keeps working concurrently. The last stage (consume) runs in the calling
+thread: the scanner uses it for DB writes, so the DB connection is only
+ever used by one thread and the cycle still commits a single transaction.
+
+End of stream is signalled with the DONE sentinel: a source/stage sends one
+DONE per downstream worker once all its own workers have finished.
+Any exception in a worker sets the shared stop event and is re-raised by
+consume(), which makes every other stage stop at its next queue operation.
+"""
+
+# === Imports ===
+import queue, logging, threading
+
+# === Constants ===
+DONE = object()
+QUEUE_POLL_SECONDS = 0.2
+
+class PipelineError(RuntimeError):
+    """Raised by consume() when a stage worker failed."""
+
+# === Queue Helpers (stop-aware) ===
+def _put(q, item, stop_event):
+    while not stop_event.is_set():
+        try: q.put(item, timeout=QUEUE_POLL_SECONDS); return True
+        except queue.Full: continue
+    return False
+
+def _get(q, stop_event):
+    while not stop_event.is_set():
+        try: return q.get(timeout=QUEUE_POLL_SECONDS)
+        except queue.Empty: continue
+    return DONE
+
+def _record_error(name, exc, stop_event, errors):
+    logging.exception(f"ERROR: Pipeline stage '{name}' failed: {exc}")
+    errors.append((name, exc)); stop_event.set()
+
+# === Stages ===
+def start_source(name, items, out_q, stop_event, errors, out_consumers=1):
+    """Starts a thread feeding 'items' into out_q, followed by one DONE per downstream worker."""
+    def run():
+        try:
+            for item in items:
+                if not _put(out_q, item, stop_event): return
+        except Exception as e: _record_error(name, e, stop_event, errors)
+        for _ in range(out_consumers): _put(out_q, DONE, stop_event)
+    thread = threading.Thread(target=run, name=f"{name}", daemon=True); thread.start()
+    return [thread]
+
+def start_stage(name, fn, in_q, out_q, stop_event, errors, workers=1, out_consumers=1):
+    """
+    Starts 'workers' threads applying fn to items from in_q and putting the
+    results (None results are dropped) into out_q.
+    """
+    remaining = [workers]; lock = threading.Lock()
+
+    def run():
+        try:
+            while True:
+                item = _get(in_q, stop_event)
+                if item is DONE: break
+                result = fn(item)
+                if result is not None and not _put(out_q, result, stop_event): break
+        except Exception as e: _record_error(name, e, stop_event, errors)
+        finally:
+            with lock: remaining[0] -= 1; last_worker = remaining[0] == 0
+            if last_worker:
+                for _ in range(out_consumers): _put(out_q, DONE, stop_event)
+
+    threads = [threading.Thread(target=run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+    for thread in threads: thread.start()
+    return threads
+
+def consume(in_q, fn, stop_event, errors, producers=1):
+    """Runs fn on every item in the calling thread until all 'producers' sent DONE."""
+    done_count = 0
+    while done_count < producers:
+        item = _get(in_q, stop_event)
+        if errors: raise PipelineError(f"Pipeline stage '{errors[0][0]}' failed: {errors[0][1]}")
+        if item is DONE: done_count += 1; continue
+        fn(item)
+
+def stop_and_join(threads, stop_event):
+    """Stops all stages (no-op if they already finished) and waits for their threads."""
+    stop_event.set()
+    for thread in threads: thread.join()
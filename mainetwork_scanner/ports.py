@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""TCP connect port scanning (plain sockets, no raw-socket capability required)."""
+
+# === Imports ===
+import socket, logging
+import concurrent.futures
+
+# === Port Scan Functions ===
+def parse_port_range(range_str): # Syntax Corrected
+    ports = set();
+    if not range_str: logging.warning("WARNING: PORT_SCAN_RANGE is empty."); return ports
+    try:
+        for part in range_str.split(','):
+            part = part.strip()
+            if not part: continue
+            if '-' in part:
+                start, end = map(int, part.split('-', 1))
+                if start <= end and start > 0 and end < 65536: ports.update(range(start, end + 1))
+                else: logging.warning(f"WARNING: Invalid port range ignored: {part}")
+            else:
+                 port_num = int(part)
+                 # Corrected Indentation
+                 if 1 <= port_num <= 65535:
+                     ports.add(port_num)
+                 else:
+                     logging.warning(f"WARNING: Invalid port number ignored: {part}")
+    except ValueError: logging.error(f"ERROR: Invalid PORT_SCAN_RANGE format: '{range_str}'."); return set()
+    return ports
+
+def scan_port(ip, port, timeout): # Unchanged
+    sock = None
+    try: sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM); sock.settimeout(timeout); return sock.connect_ex((ip, port)) == 0
+    except socket.error: return False
+    finally:
+        if sock: sock.close()
+
+def scan_ports_threaded(ip, ports_to_scan, timeout, max_threads): # Unchanged
+    open_ports = []; actual_threads = min(max_threads, len(ports_to_scan) if ports_to_scan else 1);
+    if actual_threads <= 0 : actual_threads = 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=actual_threads) as executor:
+        future_to_port = {executor.submit(scan_port, ip, port, timeout): port for port in ports_to_scan}
+        for future in concurrent.futures.as_completed(future_to_port):
+            port = future_to_port[future];
+            try:
+                if future.result(): open_ports.append(port)
+            except Exception as exc: logging.warning(f'WARNING: Exception scanning {ip}:{port} - {exc}')
+    if open_ports: open_ports.sort(); return ",".join(map(str, open_ports))
+    else: return ""
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+Network probes (ARP discovery, ICMP ping) backed by Scapy.
+
+Scapy takes 1-2s to import and needs raw-socket capability, so it is
+loaded lazily on the first probe instead of at import time.
+"""
+
+# === Imports ===
+import sys, logging
+from ipaddress import ip_network, ip_address
+from . import config
+
+# === Lazy Scapy Backend ===
+_scapy = None
+
+def get_scapy():
+    """Imports scapy.all on first use (exits like the scanner always did if Scapy is unusable)."""
+    global _scapy
+    if _scapy is None:
+        logging.getLogger("scapy.runtime").setLevel(logging.ERROR)
+        logging.getLogger("scapy.loading").setLevel(logging.ERROR)
+        try: import scapy.all as scapy_all
+        except Exception as e: logging.critical(f"ERROR importing Scapy: {e}"); sys.exit(1)
+        scapy_all.conf.verb = 0
+        _scapy = scapy_all
+    return _scapy
+
+# === Network Discovery Functions ===
+def scan_network(network_cidr): # Syntax Corrected
+    active_hosts = {}; logging.info(f"\nStarting ARP scan on {network_cidr}...")
+    scapy = get_scapy()
+    try:
+        network_obj = ip_network(network_cidr, strict=False); packet = scapy.Ether(dst="ff:ff:ff:ff:ff:ff")/scapy.ARP(pdst=str(network_cidr))
+        answered, _ = scapy.srp(packet, timeout=config.SCAN_TIMEOUT, retry=1, verbose=False); logging.info(f"ARP scan completed. {len(answered)} hosts responded.")
+        # Corrected loop syntax
+        for _, received in answered:
+            ip = received.psrc; mac = received.hwsrc
+            try:
+                if ip_address(ip) in network_obj: active_hosts[ip] = {'mac': mac}
+            except ValueError: logging.debug(f"Debug: Ignoring invalid IP format received '{ip}'")
+    except ValueError: logging.error(f"ERROR: Invalid network range '{network_cidr}'"); return None
+    except PermissionError: logging.critical("ERROR: Root permissions needed."); sys.exit(1)
+    except NameError as ne: logging.critical(f"ERROR: NameError during ARP scan: {ne}. Check imports."); return None
+    except Exception as e: logging.error(f"ERROR during ARP scan: {e}"); return None
+    return active_hosts
+
+def is_host_reachable_by_ping(ip_address, timeout=None, retry=None):
+    if not ip_address: return False
+    timeout = config.PING_TIMEOUT if timeout is None else timeout; retry = config.PING_RETRY if retry is None else retry
+    scapy = get_scapy()
+    try: response = scapy.sr1(scapy.IP(dst=ip_address)/scapy.ICMP(), timeout=timeout, retry=retry, verbose=False); return response is not None
+    except Exception as e: logging.warning(f"WARNING: Ping error to {ip_address}: {e}"); return False
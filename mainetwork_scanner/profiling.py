@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in cProfile helpers for slow scan cycles and slow web requests.
+
+A Profiler is started around a unit of work (one scan cycle, one request);
+the profile is written to a .prof file only when the work took longer than
+a threshold, and only the newest 'keep' files per label are kept.
+Inspect a capture with: python -m pstats <file.prof> (then 'sort cumtime', 'stats 20').
+
+Threads: since Python 3.12 cProfile sees every thread; on older versions
+threads started while profiling (pipeline stages, port scan pool) get their
+own profiler, merged into the saved file.
+"""
+
+# === Imports ===
+import os, sys, glob, time, logging, cProfile, pstats, threading
+from io import StringIO
+from datetime import datetime
+
+# === Constants ===
+PROFILE_SUFFIX = ".prof"
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# === Profiler ===
+class Profiler:
+    """cProfile wrapper: start(), stop() -> elapsed seconds, save_if_slow()."""
+
+    def __init__(self, include_threads=True):
+        self.include_threads = include_threads and not PROFILES_ALL_THREADS
+        self._profile = cProfile.Profile(); self._thread_profiles = []; self._lock = threading.Lock()
+        self._start = None; self.elapsed = None
+
+    def _thread_hook(self, frame, event, arg):
+        # Called once per new thread (threading.setprofile); enable() replaces this hook
+        thread_profile = cProfile.Profile()
+        with self._lock: self._thread_profiles.append(thread_profile)
+        thread_profile.enable()
+
+    def start(self):
+        """Starts profiling. Raises ValueError if another profiler is already active (Python >= 3.12)."""
+        self._profile.enable()
+        if self.include_threads: threading.setprofile(self._thread_hook)
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._start
+        if self.include_threads: threading.setprofile(None)
+        self._profile.disable()
+        return self.elapsed
+
+    def stats(self):
+        stats = pstats.Stats(self._profile)
+        with self._lock: thread_profiles = list(self._thread_profiles)
+        for thread_profile in thread_profiles:
+            try: stats.add(thread_profile)
+            except TypeError: pass # Thread never produced any profiling event
+        return stats
+
+    def save_if_slow(self, directory, label, threshold_seconds, keep, force=False):
+        """Dumps the profile if elapsed >= threshold (or force). Returns the file path or None."""
+        if self.elapsed is None or (not force and self.elapsed < threshold_seconds): return None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            file_name = f"{label}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{int(self.elapsed * 1000)}ms{PROFILE_SUFFIX}"
+            path = os.path.join(directory, file_name)
+            self.stats().dump_stats(path)
+            rotate_profiles(directory, label, keep)
+            return path
+        except (OSError, TypeError) as e:
+            logging.error(f"ERROR: Failed to save profile '{label}': {e}")
+            return None
+
+def rotate_profiles(directory, label, keep):
+    """Keeps only the newest 'keep' profiles for the label."""
+    files = sorted(glob.glob(os.path.join(directory, f"{glob.escape(label)}-*{PROFILE_SUFFIX}")), key=os.path.getmtime, reverse=True)
+    for old_file in files[max(keep, 0):]:
+        try: os.remove(old_file)
+        except OSError as e: logging.warning(f"WARNING: Cannot remove old profile '{old_file}': {e}")
+
+def top_functions(profiler, limit=10, sort_key='cumulative'):
+    """Returns the 'limit' top entries as text (for logging a short summary)."""
+    stream = StringIO(); stats = profiler.stats(); stats.stream = stream
+    stats.sort_stats(sort_key).print_stats(limit)
+    return stream.getvalue()
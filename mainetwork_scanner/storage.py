@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Storage layer shared by the scanner and the web application.
+
+Two backends are supported, selected with DB_BACKEND in .env:
+  - 'mariadb' (default): the MariaDB server configured by setup_environment.sh.
+  - 'sqlite': an embedded SQLite database in WAL mode, no server required.
+
+Both backends use qmark ('?') placeholders and expose a connection whose
+cursor() accepts dictionary=True, so the calling code stays the same.
+The few MariaDB-only SQL functions used by the queries (INET_ATON, NOW)
+are registered as SQLite functions; statements that cannot be shared
+(e.g. the multi-table DELETE of the history purge) live here per backend.
+
+SQLite has a single database-wide write lock: writers should keep their
+transactions short (the scanner buffers a cycle's writes and applies them
+with begin_write() at the end) so web edits never wait on a scan.
+"""
+
+# === Imports ===
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from ipaddress import IPv4Address, AddressValueError
+
+# --- MariaDB Connector Import (optional when using SQLite) ---
+try: import mariadb
+except ImportError: mariadb = None
+
+# === Constants ===
+BACKEND_MARIADB = "mariadb"
+BACKEND_SQLITE = "sqlite"
+BACKENDS = (BACKEND_MARIADB, BACKEND_SQLITE)
+
+# Exceptions raised by any available driver, usable directly in 'except' clauses
+DB_ERRORS = (sqlite3.Error, mariadb.Error) if mariadb else (sqlite3.Error,)
+
+# Database files whose schema/journal mode were already set up by this process
+_sqlite_initialized_paths = set()
+_sqlite_init_lock = threading.Lock()
+
+# Timestamps are stored as naive UTC 'YYYY-MM-DD HH:MM:SS' strings in SQLite
+SQLITE_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Schema used for the embedded database (MariaDB tables are created by setup_environment.sh)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    ip_address VARCHAR(45) PRIMARY KEY,
+    mac_address VARCHAR(17),
+    vendor VARCHAR(255),
+    hostname VARCHAR(255),
+    ports TEXT,
+    note TEXT,
+    status TEXT NOT NULL DEFAULT 'OFFLINE' CHECK (status IN ('ONLINE', 'OFFLINE')),
+    known_host INTEGER NOT NULL DEFAULT 0,
+    first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_seen_online DATETIME,
+    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_mac_address ON hosts (mac_address);
+CREATE INDEX IF NOT EXISTS idx_status ON hosts (status);
+CREATE INDEX IF NOT EXISTS idx_known_host ON hosts (known_host);
+CREATE TRIGGER IF NOT EXISTS trg_hosts_last_updated AFTER UPDATE ON hosts
+FOR EACH ROW WHEN NEW.last_updated IS OLD.last_updated
+BEGIN
+    UPDATE hosts SET last_updated = CURRENT_TIMESTAMP WHERE ip_address = NEW.ip_address;
+END;
+CREATE TABLE IF NOT EXISTS host_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ip_address VARCHAR(45) NOT NULL,
+    status INTEGER NOT NULL,
+    event_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_history_ip ON host_history (ip_address);
+CREATE INDEX IF NOT EXISTS idx_history_time ON host_history (event_time);
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type VARCHAR(32) NOT NULL,
+    ip_address VARCHAR(45) NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'SENT', 'SKIPPED', 'FAILED')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    dispatched_at DATETIME,
+    delivered_sinks TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON event_outbox (status, next_attempt_at);
+"""
+
+# --- Backend specific statements ---
+PURGE_HISTORY_QUERIES = {
+    # Multi-table DELETE with LEFT JOIN (MariaDB only)
+    BACKEND_MARIADB: """
+        DELETE hh
+        FROM host_history hh
+        LEFT JOIN (
+            SELECT MAX(id) as max_id
+            FROM host_history
+            GROUP BY ip_address
+        ) latest ON hh.id = latest.max_id
+        WHERE hh.event_time < ?
+          AND latest.max_id IS NULL -- Delete only if it's NOT the latest record for its IP
+    """,
+    # SQLite has no multi-table DELETE, a NOT IN subquery is cheap in-process
+    BACKEND_SQLITE: """
+        DELETE FROM host_history
+        WHERE event_time < ?
+          AND id NOT IN (SELECT MAX(id) FROM host_history GROUP BY ip_address)
+    """,
+}
+
+# === SQLite Type Adapters / SQL Functions ===
+def _adapt_datetime(value):
+    """Stores datetimes as naive UTC text (aware values are converted to UTC first)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(SQLITE_TS_FORMAT)
+
+def _convert_datetime(raw):
+    """Parses DATETIME columns back to naive datetimes, like the MariaDB connector returns."""
+    text = raw.decode('utf-8')
+    try: return datetime.strptime(text[:19], SQLITE_TS_FORMAT)
+    except ValueError: return datetime.fromisoformat(text)
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+def _sqlite_inet_aton(ip):
+    """SQLite version of MariaDB INET_ATON (NULL for non IPv4 values)."""
+    try: return int(IPv4Address(ip))
+    except (AddressValueError, ValueError, TypeError): return None
+
+def _sqlite_now():
+    """SQLite version of MariaDB NOW(), in UTC like CURRENT_TIMESTAMP."""
+    return datetime.now(timezone.utc).strftime(SQLITE_TS_FORMAT)
+
+def _dict_row_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+# === SQLite Connection Wrapper ===
+class SQLiteConnection:
+    """
+    Thin wrapper around sqlite3.Connection matching the parts of the
+    MariaDB connector API used by this project (cursor(dictionary=True),
+    autocommit attribute, commit/rollback/close).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @property
+    def autocommit(self):
+        return self._conn.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, value):
+        # sqlite3 opens a transaction implicitly before DML unless isolation_level is None
+        self._conn.isolation_level = None if value else ""
+
+    def cursor(self, dictionary=False):
+        cursor = self._conn.cursor()
+        if dictionary: cursor.row_factory = _dict_row_factory
+        return cursor
+
+    def begin_immediate(self):
+        """Opens a write transaction now, waiting (up to the timeout) for the write lock."""
+        if not self._conn.in_transaction: self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self): self._conn.commit()
+    def rollback(self): self._conn.rollback()
+    def close(self): self._conn.close()
+
+# === Connection Helpers ===
+def normalize_backend(name):
+    """Returns a valid backend name, falling back to MariaDB for unknown values."""
+    backend = (name or BACKEND_MARIADB).strip().lower()
+    if backend not in BACKENDS:
+        logging.warning(f"WARNING: Unknown DB_BACKEND '{name}', using '{BACKEND_MARIADB}'.")
+        return BACKEND_MARIADB
+    return backend
+
+def connect_mariadb(host, port, user, password, database, timeout=10):
+    """Opens a MariaDB connection (autocommit off). Raises on failure."""
+    if mariadb is None: raise RuntimeError("'mariadb' library not installed.")
+    conn = mariadb.connect(host=host, port=port, user=user, password=password, database=database, connect_timeout=timeout)
+    conn.autocommit = False
+    return conn
+
+def _init_sqlite_database(raw_conn, path):
+    """Switches the file to WAL and creates the schema, once per process and path."""
+    key = path if path == ":memory:" else os.path.abspath(path)
+    with _sqlite_init_lock:
+        if key in _sqlite_initialized_paths: return
+        raw_conn.execute("PRAGMA journal_mode=WAL") # Persistent: stored in the database file
+        raw_conn.executescript(SQLITE_SCHEMA)
+        if path != ":memory:": _sqlite_initialized_paths.add(key) # Every ':memory:' connection is a new database
+
+def connect_sqlite(path, timeout=10):
+    """
+    Opens (and initializes if needed) the embedded SQLite database in WAL mode.
+    WAL lets the web app read while the scanner writes; synchronous=NORMAL is
+    durable across application crashes and avoids an fsync per commit.
+    The connection may be handed to worker threads, callers serialize its use.
+    """
+    raw_conn = sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    _init_sqlite_database(raw_conn, path)
+    raw_conn.execute("PRAGMA synchronous=NORMAL")
+    raw_conn.execute("PRAGMA foreign_keys=ON")
+    raw_conn.create_function("INET_ATON", 1, _sqlite_inet_aton, deterministic=True)
+    raw_conn.create_function("NOW", 0, _sqlite_now)
+    conn = SQLiteConnection(raw_conn)
+    conn.autocommit = False
+    return conn
+
+def connect(backend, host=None, port=None, user=None, password=None, database=None, sqlite_path=None, timeout=10):
+    """Opens a connection for the given backend. Raises DB_ERRORS / RuntimeError on failure."""
+    if normalize_backend(backend) == BACKEND_SQLITE:
+        return connect_sqlite(sqlite_path, timeout=timeout)
+    return connect_mariadb(host, port, user, password, database, timeout=timeout)
+
+def begin_write(conn):
+    """
+    Starts the write transaction of a batch of buffered writes. On SQLite the
+    write lock is taken here (BEGIN IMMEDIATE) instead of at the first UPDATE;
+    MariaDB opens transactions implicitly and locks rows, nothing to do.
+    """
+    if isinstance(conn, SQLiteConnection): conn.begin_immediate()
+
+def purge_history_query(backend):
+    """Returns the 'purge old history, keep latest per host' DELETE for the backend."""
+    return PURGE_HISTORY_QUERIES[normalize_backend(backend)]
@@ -24,6 +24,7 @@ WRAPPER_SCANNER_SCRIPT="run_scanner.sh"
 PYTHON_WEBAPP_SCRIPT="webapp.py"
 SERVICE_SCANNER="mainetwork_scanner"
 SERVICE_WEBAPP="mainetwork_scanner_web"
+SERVICE_DISPATCHER="mainetwork_scanner_notify"
 FLASK_PORT=5000
 # The MariaDB password will be asked
 
@@ -248,6 +249,30 @@ fi
 log_info "'host_history' table created/verified OK."
 # --- END NEW ---
 
+# --- Create event_outbox table (notification events, see OUTBOX_ENABLED) ---
+log_info "Creating 'event_outbox' table..."
+mysql ${DB_NAME} <<MYSQL_SCRIPT
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(32) NOT NULL,              -- 'new_host' or 'state_change'
+    ip_address VARCHAR(45) NOT NULL,
+    payload TEXT NOT NULL,                        -- Event as JSON
+    status ENUM('PENDING','SENT','SKIPPED','FAILED') NOT NULL DEFAULT 'PENDING',
+    attempts INT NOT NULL DEFAULT 0,              -- Delivery attempts so far
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    dispatched_at DATETIME NULL,
+    delivered_sinks VARCHAR(255) NULL,            -- Sinks that already received the event (comma separated)
+    last_error TEXT NULL,
+    INDEX idx_outbox_pending (status, next_attempt_at) -- Index for the dispatcher poll
+);
+MYSQL_SCRIPT
+if [ $? -ne 0 ]; then
+    log_error "Failed to create 'event_outbox' table."
+    exit 1
+fi
+log_info "'event_outbox' table created/verified OK."
+
 # === Configuring Virtual Python env (Venv) ===
 log_step "Configuring Venv Python"
 if [ ! -d "$VENV_PATH" ]; then
@@ -409,6 +434,28 @@ WantedBy=multi-user.target
 EOF
 log_info "File service webapp: $SYSTEMD_WEBAPP_FILE"
 
+# === Systemd Service creation for the Notification Dispatcher ===
+log_step "Creating Systemd Notification service (${SERVICE_DISPATCHER}.service)"
+SYSTEMD_DISPATCHER_FILE="/etc/systemd/system/${SERVICE_DISPATCHER}.service"
+cat > "$SYSTEMD_DISPATCHER_FILE" << EOF
+[Unit]
+Description=Network Scanner Notification Dispatcher (event outbox -> webhook/syslog/SMTP)
+After=network.target
+
+[Service]
+User=${SERVICE_USER}
+WorkingDirectory=${PROJECT_DIR}
+ExecStart=${VENV_PATH}/bin/python -m mainetwork_scanner.dispatcher
+Restart=on-failure
+RestartSec=10s
+StandardOutput=journal
+StandardError=journal
+
+[Install]
+WantedBy=multi-user.target
+EOF
+log_info "File service dispatcher: $SYSTEMD_DISPATCHER_FILE"
+
 # === Gestione Servizi Systemd ===
 log_step "Managing Services Systemd"
 log_info "Demon systemd reload..."
@@ -418,11 +465,15 @@ log_info "Enabling service ${SERVICE_SCANNER}..."
 systemctl enable "${SERVICE_SCANNER}.service"
 log_info "Enabling service ${SERVICE_WEBAPP}..."
 systemctl enable "${SERVICE_WEBAPP}.service"
+log_info "Enabling service ${SERVICE_DISPATCHER}..."
+systemctl enable "${SERVICE_DISPATCHER}.service"
 
 log_info "Restart service ${SERVICE_SCANNER}..."
 systemctl restart "${SERVICE_SCANNER}.service"
 log_info "Restart service ${SERVICE_WEBAPP}..."
 systemctl restart "${SERVICE_WEBAPP}.service"
+log_info "Restart service ${SERVICE_DISPATCHER} (marks events SKIPPED if no NOTIFY_* sink is configured)..."
+systemctl restart "${SERVICE_DISPATCHER}.service"
 sleep 2 # Pausa per dare tempo ai servizi di avviarsi
 
 log_info "State ${SERVICE_SCANNER}:"
@@ -14,29 +14,49 @@ document.addEventListener('DOMContentLoaded', () => {
         return;
     }
 
+    // POST the content to the save API (preview=true only counts the hosts whose vendor would change)
+    async function postCustomOui(content, preview) {
+        const response = await fetch('/api/custom_oui/save', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ content: content, preview: preview }),
+        });
+
+        const result = await response.json();
+
+        if (!response.ok || !result.success) {
+            throw new Error(result.error || `Server error ${response.status}`);
+        }
+        return result;
+    }
+
     saveButton.addEventListener('click', async () => {
         const newContent = contentTextArea.value; // Get current content
-        statusDiv.textContent = 'Saving...';
+        statusDiv.textContent = 'Checking affected hosts...';
         statusDiv.className = ''; // Clear previous status class
         saveButton.disabled = true;
 
         console.log("Attempting to save custom OUI content...");
 
         try {
-            const response = await fetch('/api/custom_oui/save', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ content: newContent }),
-            });
-
-            const result = await response.json();
-
-            if (!response.ok || !result.success) {
-                throw new Error(result.error || `Server error ${response.status}`);
+            // Preview: ask for confirmation if existing hosts will be re-vendored
+            let preview = null;
+            try {
+                preview = await postCustomOui(newContent, true);
+            } catch (previewError) {
+                console.warn("Preview of affected hosts failed, saving anyway:", previewError);
+            }
+            if (preview && preview.affected_hosts > 0 &&
+                !confirm(`This change updates the vendor of ${preview.affected_hosts} host(s). Save?`)) {
+                statusDiv.textContent = 'Save cancelled.';
+                return;
             }
 
+            statusDiv.textContent = 'Saving...';
+            const result = await postCustomOui(newContent, false);
+
             console.log("Save successful:", result.message);
             statusDiv.textContent = result.message || 'Saved successfully!';
             statusDiv.className = 'status-success';
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures; also makes the project root importable when pytest is started from any directory."""
+
+import os, sys
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path: sys.path.insert(0, PROJECT_DIR)
+
+from mainetwork_scanner import config, storage
+
+@pytest.fixture
+def sqlite_config(tmp_path, monkeypatch):
+    """Points config at a temporary SQLite database (created on first connect)."""
+    monkeypatch.setattr(config, 'DB_BACKEND', storage.BACKEND_SQLITE)
+    monkeypatch.setattr(config, 'SQLITE_PATH', str(tmp_path / "scanner.db"))
+    return config.SQLITE_PATH
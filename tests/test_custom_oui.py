@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Custom OUI change detection and host re-vendoring (/api/custom_oui/save) on a
+temporary SQLite database: added, changed and removed prefixes, offline hosts,
+MAC prefix range lookups and the preview mode.
+"""
+
+import pytest
+import webapp
+from mainetwork_scanner import db, oui
+
+OLD_CUSTOM = "# custom\nAABBCC Foo\nDDEEFF Bar\n"
+NEW_CUSTOM = "# custom\nDDEEFF Baz\n112233 Newco\n" # AABBCC removed, DDEEFF changed, 112233 added
+STANDARD_OUI = "AA-BB-CC   (hex)\t\tReal Vendor\n"
+HOSTS = [
+    # ip, mac, vendor, status
+    ("10.0.0.1", "aa:bb:cc:00:00:01", "Foo (Custom)", "ONLINE"),   # removed prefix
+    ("10.0.0.2", "dd:ee:ff:00:00:02", "Bar (Custom)", "OFFLINE"),  # changed prefix, offline host
+    ("10.0.0.3", "11:22:33:00:00:03", "Unknown", "ONLINE"),        # added prefix
+    ("10.0.0.4", "aa:bb:cd:00:00:04", "Other", "ONLINE"),          # neighbour prefixes: outside the ranges
+    ("10.0.0.5", "aa:bb:cb:ff:ff:ff", "Other", "OFFLINE"),
+]
+
+# === Fixtures ===
+@pytest.fixture
+def oui_files(tmp_path, monkeypatch):
+    custom_path = tmp_path / "custom_oui.txt"; custom_path.write_text(OLD_CUSTOM, encoding='utf-8')
+    standard_path = tmp_path / "oui.txt"; standard_path.write_text(STANDARD_OUI, encoding='utf-8')
+    monkeypatch.setattr(webapp, 'CUSTOM_OUI_FULL_PATH', str(custom_path))
+    monkeypatch.setattr(webapp, 'OUI_FULL_PATH', str(standard_path))
+    return custom_path, standard_path
+
+@pytest.fixture
+def conn(sqlite_config):
+    connection = db.connect_db(); cursor = connection.cursor()
+    cursor.executemany("INSERT INTO hosts (ip_address, mac_address, vendor, status) VALUES (?, ?, ?, ?)", HOSTS)
+    connection.commit(); cursor.close()
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def client():
+    return webapp.app.test_client()
+
+def vendors(conn):
+    cursor = conn.cursor(); cursor.execute("SELECT ip_address, vendor FROM hosts ORDER BY ip_address"); result = dict(cursor.fetchall()); cursor.close()
+    return result
+
+# === Tests ===
+def test_diff_prefix_maps_detects_added_changed_and_removed():
+    old_map = oui.parse_custom_oui_lines(OLD_CUSTOM.splitlines(), "old")[0]
+    new_map = oui.parse_custom_oui_lines(NEW_CUSTOM.splitlines(), "new")[0]
+    assert oui.diff_prefix_maps(old_map, new_map) == {"AABBCC", "DDEEFF", "112233"}
+    assert oui.diff_prefix_maps(old_map, dict(old_map)) == set()
+
+def test_mac_prefix_range_covers_only_the_prefix(conn):
+    assert db.mac_prefix_range("AABBCC") == ("aa:bb:cc:", "aa:bb:cc;")
+    found = db.find_hosts_by_mac_prefix(conn, {"AABBCC", "DDEEFF"})
+    assert sorted(host['ip_address'] for host in found) == ["10.0.0.1", "10.0.0.2"]
+
+def test_preview_leaves_file_and_db_untouched(conn, oui_files, client):
+    custom_path, _ = oui_files
+    response = client.post('/api/custom_oui/save', json={"content": NEW_CUSTOM, "preview": True})
+    assert response.status_code == 200
+    assert response.get_json()['affected_hosts'] == 3 and response.get_json()['changed_prefixes'] == 3
+    assert custom_path.read_text(encoding='utf-8') == OLD_CUSTOM
+    assert vendors(conn) == {ip: vendor for ip, _, vendor, _ in HOSTS}
+
+def test_save_revendors_only_affected_hosts(conn, oui_files, client):
+    custom_path, _ = oui_files
+    response = client.post('/api/custom_oui/save', json={"content": NEW_CUSTOM})
+    assert response.status_code == 200 and response.get_json()['reclassified_hosts'] == 3
+    assert custom_path.read_text(encoding='utf-8') == NEW_CUSTOM
+    assert vendors(conn) == {"10.0.0.1": "Real Vendor", "10.0.0.2": "Baz (Custom)", "10.0.0.3": "Newco (Custom)", "10.0.0.4": "Other", "10.0.0.5": "Other"}
+
+def test_removed_prefix_without_standard_list_becomes_unknown(conn, oui_files, client):
+    _, standard_path = oui_files; standard_path.unlink()
+    preview = client.post('/api/custom_oui/save', json={"content": NEW_CUSTOM, "preview": True}).get_json()
+    assert preview['affected_hosts'] == 3
+    response = client.post('/api/custom_oui/save', json={"content": NEW_CUSTOM}).get_json()
+    assert response['reclassified_hosts'] == 3
+    assert vendors(conn)["10.0.0.1"] == "Unknown"
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Outbox dispatcher tests against a local HTTP stand-in and a temporary SQLite
+database: delivery, backoff rescheduling, FAILED after DISPATCH_MAX_ATTEMPTS,
+dedupe, per-sink retries and the retention purge.
+"""
+
+import json, asyncio, threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from mainetwork_scanner import config, db, outbox, dispatcher
+
+# === Fixtures ===
+class WebhookStandIn(BaseHTTPRequestHandler):
+    """Answers with the next queued status code (200 when the queue is empty) and records the events."""
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.received.append(body['events'])
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status); self.end_headers()
+
+    def log_message(self, *args): pass
+
+@pytest.fixture
+def webhook():
+    server = HTTPServer(('127.0.0.1', 0), WebhookStandIn); server.received = []; server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True); thread.start()
+    yield server
+    server.shutdown(); server.server_close()
+
+@pytest.fixture
+def conn(sqlite_config, monkeypatch):
+    monkeypatch.setattr(config, 'NOTIFY_EVENTS', {outbox.EVENT_NEW_HOST, outbox.EVENT_STATE_CHANGE})
+    monkeypatch.setattr(config, 'DISPATCH_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(config, 'DISPATCH_RETRY_BASE_SECONDS', 30)
+    monkeypatch.setattr(config, 'PURGE_HISTORY_HOURS', 72)
+    connection = db.connect_db()
+    yield connection
+    connection.close()
+
+class FlakySink:
+    """In-memory sink failing the first 'failures' sends."""
+    name = "flaky"
+
+    def __init__(self, failures):
+        self.failures = failures; self.received = []
+
+    def send(self, events):
+        if self.failures: self.failures -= 1; raise RuntimeError("sink down")
+        self.received.append(events)
+
+# === Helpers ===
+def queue_events(conn, *ips, event_type=outbox.EVENT_STATE_CHANGE, event_time=None):
+    cursor = conn.cursor()
+    outbox.write_events(cursor, [outbox.make_event(event_type, ip, event_time or outbox.utc_now(), status='ONLINE') for ip in ips])
+    conn.commit(); cursor.close()
+
+def rows(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT id, ip_address, status, attempts, next_attempt_at, delivered_sinks FROM event_outbox ORDER BY id")
+    result = cursor.fetchall(); cursor.close()
+    return result
+
+def make_due(conn):
+    cursor = conn.cursor(); cursor.execute("UPDATE event_outbox SET next_attempt_at = ?", (outbox.utc_now() - timedelta(seconds=1),)); conn.commit(); cursor.close()
+
+def run_once(sinks):
+    asyncio.run(dispatcher.run(once=True, sinks=sinks))
+
+def webhook_sink(server):
+    return dispatcher.WebhookSink(f"http://127.0.0.1:{server.server_port}/hook", timeout=5)
+
+# === Tests ===
+def test_delivers_and_marks_sent(conn, webhook):
+    queue_events(conn, "10.0.0.1", "10.0.0.2")
+    run_once([webhook_sink(webhook)])
+    assert [event['ip_address'] for event in webhook.received[0]] == ["10.0.0.1", "10.0.0.2"]
+    assert [row['status'] for row in rows(conn)] == [outbox.STATUS_SENT] * 2
+
+def test_dedupe_keeps_newest_event_per_host(conn, webhook):
+    for _ in range(20): queue_events(conn, "10.0.0.1")
+    run_once([webhook_sink(webhook)])
+    assert len(webhook.received) == 1 and len(webhook.received[0]) == 1
+    statuses = [row['status'] for row in rows(conn)]
+    assert statuses.count(outbox.STATUS_SKIPPED) == 19 and statuses[-1] == outbox.STATUS_SENT
+
+def test_failed_delivery_is_rescheduled_with_backoff(conn, webhook):
+    webhook.statuses = [500]
+    queue_events(conn, "10.0.0.1")
+    run_once([webhook_sink(webhook)])
+    row = rows(conn)[0]
+    assert row['status'] == outbox.STATUS_PENDING and row['attempts'] == 1
+    assert row['next_attempt_at'] >= outbox.utc_now() + timedelta(seconds=25)
+    make_due(conn); run_once([webhook_sink(webhook)])
+    assert rows(conn)[0]['status'] == outbox.STATUS_SENT and len(webhook.received) == 2
+
+def test_marked_failed_after_max_attempts(conn, webhook):
+    webhook.statuses = [500] * config.DISPATCH_MAX_ATTEMPTS
+    queue_events(conn, "10.0.0.1")
+    for _ in range(config.DISPATCH_MAX_ATTEMPTS): make_due(conn); run_once([webhook_sink(webhook)])
+    row = rows(conn)[0]
+    assert row['status'] == outbox.STATUS_FAILED and row['attempts'] == config.DISPATCH_MAX_ATTEMPTS
+    make_due(conn); run_once([webhook_sink(webhook)])
+    assert len(webhook.received) == config.DISPATCH_MAX_ATTEMPTS # FAILED events are not retried
+
+def test_retry_only_goes_to_failed_sinks(conn, webhook):
+    flaky = FlakySink(failures=1)
+    queue_events(conn, "10.0.0.1")
+    run_once([webhook_sink(webhook), flaky])
+    row = rows(conn)[0]
+    assert row['status'] == outbox.STATUS_PENDING and row['delivered_sinks'] == "webhook"
+    make_due(conn); run_once([webhook_sink(webhook), flaky])
+    assert rows(conn)[0]['status'] == outbox.STATUS_SENT
+    assert len(webhook.received) == 1 and len(flaky.received) == 1
+
+def test_no_sink_marks_events_skipped(conn):
+    queue_events(conn, "10.0.0.1")
+    run_once([])
+    assert rows(conn)[0]['status'] == outbox.STATUS_SKIPPED
+
+def test_purge_keeps_pending_and_recent_events(conn, webhook):
+    old_time = outbox.utc_now() - timedelta(hours=config.PURGE_HISTORY_HOURS + 1)
+    queue_events(conn, "10.0.0.1", "10.0.0.2", event_time=old_time)
+    queue_events(conn, "10.0.0.3")
+    outbox.mark_done(conn, [row['id'] for row in rows(conn) if row['ip_address'] in ("10.0.0.1", "10.0.0.3")])
+    assert dispatcher.purge_old_events(conn, config.PURGE_HISTORY_HOURS) == 1
+    assert [(row['ip_address'], row['status']) for row in rows(conn)] == [("10.0.0.2", outbox.STATUS_PENDING), ("10.0.0.3", outbox.STATUS_SENT)]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+Import-time regression tests: the core modules and the web app must import
+quickly and without loading Scapy (only probes.get_scapy() may load it).
+Each import runs in a fresh interpreter so earlier imports cannot hide a regression.
+"""
+
+import os, sys, json, subprocess
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous budgets (measured locally: core ~30 ms, webapp ~140 ms) to absorb slow CI machines
+IMPORT_BUDGET_SECONDS = {
+    "mainetwork_scanner.config": 0.5,
+    "mainetwork_scanner.oui": 0.5,
+    "mainetwork_scanner.ports": 0.5,
+    "mainetwork_scanner.storage": 0.5,
+    "mainetwork_scanner.db": 0.5,
+    "webapp": 2.0,
+}
+
+CHILD_CODE = """
+import sys, json, time, importlib
+start = time.perf_counter(); importlib.import_module(sys.argv[1]); elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "scapy_loaded": any(name == 'scapy' or name.startswith('scapy.') for name in sys.modules)}))
+"""
+
+def import_in_subprocess(module_name):
+    result = subprocess.run([sys.executable, "-c", CHILD_CODE, module_name], cwd=PROJECT_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("module_name", sorted(IMPORT_BUDGET_SECONDS))
+def test_import_does_not_load_scapy(module_name):
+    assert not import_in_subprocess(module_name)["scapy_loaded"], f"{module_name} imports scapy at import time"
+
+@pytest.mark.parametrize("module_name", sorted(IMPORT_BUDGET_SECONDS))
+def test_import_time_budget(module_name):
+    # Best of 3 runs: a single slow start (cold disk cache) should not fail the test
+    seconds = min(import_in_subprocess(module_name)["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS[module_name], f"{module_name} imported in {seconds * 1000:.0f} ms (budget {IMPORT_BUDGET_SECONDS[module_name] * 1000:.0f} ms)"
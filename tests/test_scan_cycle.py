@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pipelined scan cycle tests (db.update_db_and_get_status) on a temporary SQLite
+database, with the port scan and ping probes stubbed: single-commit semantics,
+rollback when a stage or the outbox insert fails, and probe concurrency.
+"""
+
+import time, sqlite3, threading
+import pytest
+from mainetwork_scanner import config, db, outbox, ports, probes
+
+PROBE_DELAY_SECONDS = 0.2
+STAGE_THREAD_PREFIXES = ("discover-", "enrich-", "probe-", "ping-")
+
+# === Fixtures ===
+@pytest.fixture
+def conn(sqlite_config, monkeypatch):
+    monkeypatch.setattr(config, 'PORT_SCAN_ENABLED', True)
+    monkeypatch.setattr(config, 'OUTBOX_ENABLED', True)
+    monkeypatch.setattr(config, 'PIPELINE_PROBE_WORKERS', 4)
+    monkeypatch.setattr(config, 'PIPELINE_PING_WORKERS', 1)
+    connection = db.connect_db()
+    cursor = connection.cursor()
+    # 10.0.0.1 was ONLINE and is missing from the ARP scan; 10.0.0.2 comes back ONLINE
+    cursor.execute("INSERT INTO hosts (ip_address, mac_address, vendor, status) VALUES ('10.0.0.1', 'aa:bb:cc:00:00:01', 'Unknown', 'ONLINE')")
+    cursor.execute("INSERT INTO hosts (ip_address, mac_address, vendor, status) VALUES ('10.0.0.2', 'aa:bb:cc:00:00:02', 'Unknown', 'OFFLINE')")
+    connection.commit(); cursor.close()
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def commits(conn, monkeypatch):
+    """Counts commits on the scanner connection."""
+    count = [0]; real_commit = conn.commit
+    def counting_commit(): count[0] += 1; real_commit()
+    monkeypatch.setattr(conn, 'commit', counting_commit)
+    return count
+
+def stub_probes(monkeypatch, scan_ports=None, ping=None):
+    monkeypatch.setattr(ports, 'scan_ports_threaded', scan_ports or (lambda ip, port_set, timeout, threads: "22"))
+    monkeypatch.setattr(probes, 'is_host_reachable_by_ping', ping or (lambda ip: False))
+
+# === Helpers ===
+def arp_result(*ips):
+    return {ip: {'mac': f"aa:bb:cc:00:00:{ip.rsplit('.', 1)[1].zfill(2)}"} for ip in ips}
+
+def run_cycle(conn, scan):
+    return db.update_db_and_get_status(conn, scan, db.load_state_from_db(conn), {22}, True)
+
+def table(conn, query):
+    cursor = conn.cursor(); cursor.execute(query); result = cursor.fetchall(); cursor.close()
+    return result
+
+def stage_threads_alive():
+    return [thread.name for thread in threading.enumerate() if thread.name.startswith(STAGE_THREAD_PREFIXES)]
+
+# === Tests ===
+def test_cycle_commits_hosts_history_and_outbox_once(conn, commits, monkeypatch):
+    stub_probes(monkeypatch)
+    report = run_cycle(conn, arp_result("10.0.0.2", "10.0.0.3"))
+    assert commits[0] == 1
+    assert table(conn, "SELECT ip_address, status, ports FROM hosts ORDER BY ip_address") == [("10.0.0.1", "OFFLINE", None), ("10.0.0.2", "ONLINE", "22"), ("10.0.0.3", "ONLINE", "22")]
+    assert sorted(table(conn, "SELECT ip_address, status FROM host_history")) == [("10.0.0.1", 0), ("10.0.0.2", 1), ("10.0.0.3", 1)]
+    assert sorted(table(conn, "SELECT ip_address, event_type FROM event_outbox")) == [("10.0.0.1", outbox.EVENT_STATE_CHANGE), ("10.0.0.2", outbox.EVENT_STATE_CHANGE), ("10.0.0.3", outbox.EVENT_NEW_HOST)]
+    assert {ip: data['status'] for ip, data in report.items()} == {"10.0.0.1": "OFFLINE", "10.0.0.2": "ONLINE", "10.0.0.3": "ONLINE"}
+
+def failing_probe(ip, port_set, timeout, threads):
+    if ip == "10.0.0.3": raise RuntimeError("probe crashed")
+    return "22"
+
+def failing_ping(ip):
+    raise RuntimeError("ping crashed")
+
+@pytest.mark.parametrize("scan_ports, ping", [(failing_probe, None), (None, failing_ping)], ids=["probe", "ping"])
+def test_stage_failure_rolls_back_everything(conn, commits, monkeypatch, scan_ports, ping):
+    stub_probes(monkeypatch, scan_ports=scan_ports, ping=ping)
+    report = run_cycle(conn, arp_result("10.0.0.2", "10.0.0.3", "10.0.0.4"))
+    assert commits[0] == 0
+    assert table(conn, "SELECT ip_address, status, ports FROM hosts ORDER BY ip_address") == [("10.0.0.1", "ONLINE", None), ("10.0.0.2", "OFFLINE", None)]
+    assert table(conn, "SELECT COUNT(*) FROM host_history") == [(0,)]
+    assert table(conn, "SELECT COUNT(*) FROM event_outbox") == [(0,)]
+    assert all(data['status'].endswith("(DB Fail)") for data in report.values())
+    assert stage_threads_alive() == []
+
+def test_probes_run_concurrently(conn, monkeypatch):
+    def slow_probe(ip, port_set, timeout, threads): time.sleep(PROBE_DELAY_SECONDS); return "22"
+    stub_probes(monkeypatch, scan_ports=slow_probe)
+    host_count = 8; ips = [f"10.0.1.{i}" for i in range(1, host_count + 1)]
+    start = time.perf_counter(); run_cycle(conn, arp_result(*ips)); elapsed = time.perf_counter() - start
+    expected = host_count / config.PIPELINE_PROBE_WORKERS * PROBE_DELAY_SECONDS # 0.4s, serial would take 1.6s
+    assert expected * 0.9 <= elapsed < expected + 0.6, f"{host_count} probes took {elapsed:.2f}s (expected ~{expected:.2f}s)"
+    assert table(conn, "SELECT COUNT(*) FROM hosts WHERE ip_address LIKE '10.0.1.%' AND ports = '22'") == [(host_count,)]
+
+def test_outbox_failure_rolls_back_the_cycle(conn, commits, monkeypatch):
+    stub_probes(monkeypatch)
+    def broken_write_events(cursor, events): raise sqlite3.OperationalError("no such table: event_outbox")
+    monkeypatch.setattr(outbox, 'write_events', broken_write_events)
+    run_cycle(conn, arp_result("10.0.0.2", "10.0.0.3"))
+    assert commits[0] == 0
+    assert table(conn, "SELECT ip_address, status FROM hosts ORDER BY ip_address") == [("10.0.0.1", "ONLINE"), ("10.0.0.2", "OFFLINE")]
+    assert table(conn, "SELECT COUNT(*) FROM host_history") == [(0,)]
+
+def test_outbox_table_check(conn):
+    assert outbox.table_exists(conn)
+    cursor = conn.cursor(); cursor.execute("DROP TABLE event_outbox"); conn.commit(); cursor.close()
+    assert not outbox.table_exists(conn)
@@ -6,54 +6,62 @@ import os
 import sys
 import logging
 from datetime import datetime, timezone
-from dotenv import load_dotenv
-from flask import Flask, render_template, jsonify, request, flash, redirect, url_for
-import mariadb
+from flask import Flask, render_template, jsonify, request, flash, redirect, url_for, g
 from collections import defaultdict
+from mainetwork_scanner import config, storage, profiling, oui, db
 
 # === Basic Logging Setup ===
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # === Configuration ===
-load_dotenv()
-PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+config.load() # Loads .env; settings shared with the scanner (DB, OUI files, profiling) are read from config
+PROJECT_DIR = config.PROJECT_DIR
 
 # Flask App Initialization
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "change_this_in_production") # Use a strong secret key
 
-# Database Credentials
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = int(os.getenv("DB_PORT", 3306))
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = os.getenv("DB_NAME")
-
 # Custom OUI File Path
-CUSTOM_OUI_FILE = os.getenv("CUSTOM_OUI_FILE", "custom_oui.txt")
+CUSTOM_OUI_FILE = config.CUSTOM_OUI_FILE
 CUSTOM_OUI_FULL_PATH = os.path.join(PROJECT_DIR, CUSTOM_OUI_FILE)
+# Standard OUI File Path (needed to re-vendor hosts whose custom prefix was removed)
+OUI_FULL_PATH = os.path.join(PROJECT_DIR, config.OUI_FILE)
 
 # Allowed fields for inline update via API
 ALLOWED_UPDATE_FIELDS = ['hostname', 'note']
 
 # === Database Connection Helper ===
 def get_db_connection():
-    """Establishes and returns a MariaDB connection object or None on failure."""
-    conn = None
-    if not all([DB_USER, DB_PASSWORD, DB_NAME]):
+    """Establishes and returns a DB connection (MariaDB or SQLite, see DB_BACKEND) or None on failure."""
+    if config.DB_BACKEND == storage.BACKEND_MARIADB and not all([config.DB_USER, config.DB_PASSWORD, config.DB_NAME]):
         logging.error("Database credentials missing in .env file.")
         return None
     try:
-        conn = mariadb.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER,
-            password=DB_PASSWORD, database=DB_NAME, connect_timeout=10
+        return storage.connect(
+            config.DB_BACKEND, host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER,
+            password=config.DB_PASSWORD, database=config.DB_NAME, sqlite_path=config.SQLITE_PATH, timeout=10
         )
-        conn.autocommit = False
-        return conn
-    except mariadb.Error as e:
-        logging.error(f"Database connection failed: {e}")
+    except (*storage.DB_ERRORS, RuntimeError) as e:
+        logging.error(f"Database connection failed ({config.DB_BACKEND}): {e}")
         return None
 
+# === Request Profiling Hooks ===
+@app.before_request
+def start_request_profile():
+    """Starts a per-request profiler when WEB_PROFILE_ENABLED is set."""
+    if not config.WEB_PROFILE_ENABLED: return
+    try: g.profiler = profiling.Profiler(include_threads=False).start()
+    except ValueError: g.profiler = None # Another request is already being profiled (Python >= 3.12)
+
+@app.teardown_request
+def save_request_profile(exc):
+    """Saves the request profile if slow, or always with '?profile=1'."""
+    profiler = g.pop('profiler', None)
+    if not profiler: return
+    elapsed = profiler.stop()
+    profile_path = profiler.save_if_slow(config.PROFILE_DIR, f"web-{request.endpoint or 'unknown'}", config.WEB_PROFILE_THRESHOLD_SECONDS, config.PROFILE_KEEP, force=request.args.get('profile') == '1')
+    if profile_path: logging.warning(f"Profiled request {request.method} {request.path} ({elapsed:.3f}s): {profile_path}")
+
 # === Flask Routes ===
 
 @app.route('/')
@@ -116,7 +124,7 @@ def get_hosts_data():
                 else: processed_row[key] = value
             hosts_data.append(processed_row)
         return jsonify(hosts_data)
-    except mariadb.Error as e: logging.error(f"DB query error /api/hosts: {e}"); return jsonify({"error": f"Query error: {e}"}), 500
+    except storage.DB_ERRORS as e: logging.error(f"DB query error /api/hosts: {e}"); return jsonify({"error": f"Query error: {e}"}), 500
     except Exception as e: logging.error(f"Unexpected error /api/hosts: {e}", exc_info=True); return jsonify({"error": f"Server error: {e}"}), 500
     finally:
         if cursor: cursor.close()
@@ -135,7 +143,7 @@ def update_known_host(ip_address):
         cursor = conn.cursor(); cursor.execute("UPDATE hosts SET known_host = ? WHERE ip_address = ?", (new_known_state, ip_address));
         if cursor.rowcount == 0: conn.rollback(); logging.warning(f"UPDATE known IP {ip_address} not found."); return jsonify({"error": f"Host {ip_address} not found"}), 404
         conn.commit(); logging.info(f"DB UPDATE: IP={ip_address}, known_host={new_known_state}"); return jsonify({"success": True, "ip": ip_address, "new_state": new_known_state})
-    except mariadb.Error as e: logging.error(f"DB Error update known {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
+    except storage.DB_ERRORS as e: logging.error(f"DB Error update known {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
     except Exception as e: logging.error(f"Error update known {ip_address}: {e}", exc_info=True); conn.rollback(); return jsonify({"error": f"Server error: {e}"}), 500
     finally:
         if cursor: cursor.close()
@@ -155,7 +163,7 @@ def update_host_field(ip_address):
         cursor = conn.cursor(); update_query = f"UPDATE hosts SET `{field_name}` = ? WHERE ip_address = ?"; cursor.execute(update_query, (new_value, ip_address));
         if cursor.rowcount == 0: conn.rollback(); logging.warning(f"UPDATE {field_name} failed: IP {ip_address} not found."); return jsonify({"error": f"Host {ip_address} not found"}), 404
         conn.commit(); logging.info(f"DB UPDATE: IP={ip_address}, {field_name} updated."); return jsonify({"success": True, "ip": ip_address, "field": field_name, "new_value": new_value})
-    except mariadb.Error as e: logging.error(f"DB Error update {field_name} {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
+    except storage.DB_ERRORS as e: logging.error(f"DB Error update {field_name} {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
     except Exception as e: logging.error(f"Error update {field_name} {ip_address}: {e}", exc_info=True); conn.rollback(); return jsonify({"error": f"Server error: {e}"}), 500
     finally:
         if cursor: cursor.close()
@@ -171,7 +179,7 @@ def delete_host(ip_address):
         cursor = conn.cursor(); cursor.execute("DELETE FROM hosts WHERE ip_address = ?", (ip_address,));
         if cursor.rowcount == 0: conn.rollback(); logging.warning(f"DELETE failed: IP {ip_address} not found."); return jsonify({"error": f"Host {ip_address} not found"}), 404
         conn.commit(); logging.info(f"DB DELETE: IP={ip_address} deleted from hosts table."); return jsonify({"success": True, "message": f"Host {ip_address} deleted."})
-    except mariadb.Error as e: logging.error(f"DB Error delete {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
+    except storage.DB_ERRORS as e: logging.error(f"DB Error delete {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
     except Exception as e: logging.error(f"Error delete {ip_address}: {e}", exc_info=True); conn.rollback(); return jsonify({"error": f"Server error: {e}"}), 500
     finally:
         if cursor: cursor.close()
@@ -230,7 +238,7 @@ def get_history_data():
         # Convert defaultdict to a regular dict for JSONify
         return jsonify(dict(grouped_history))
 
-    except mariadb.Error as e:
+    except storage.DB_ERRORS as e:
         logging.error(f"DB query error /api/history: {e}")
         return jsonify({"error": f"Database query error: {e}"}), 500
     except Exception as e:
@@ -248,7 +256,7 @@ def delete_host_history(ip_address):
     cursor = None
     try:
         cursor = conn.cursor(); delete_query = "DELETE FROM host_history WHERE ip_address = ?"; cursor.execute(delete_query, (ip_address,)); deleted_count = cursor.rowcount; conn.commit(); logging.info(f"DB HISTORY DELETE: Cleared {deleted_count} records for IP={ip_address}."); return jsonify({"success": True, "message": f"History for {ip_address} cleared ({deleted_count} records)."}), 200
-    except mariadb.Error as e: logging.error(f"DB Error deleting history for {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
+    except storage.DB_ERRORS as e: logging.error(f"DB Error deleting history for {ip_address}: {e}"); conn.rollback(); return jsonify({"error": f"DB error: {e}"}), 500
     except Exception as e: logging.error(f"Error deleting history for {ip_address}: {e}", exc_info=True); conn.rollback(); return jsonify({"error": f"Server error: {e}"}), 500
     finally:
         if cursor: cursor.close()
@@ -275,7 +283,7 @@ def delete_all_history():
         logging.warning(f"DB HISTORY DELETE: Cleared ALL history records ({deleted_count} estimated).") # Log as warning due to severity
         return jsonify({"success": True, "message": f"All host history cleared ({deleted_count} records affected)."}), 200
 
-    except mariadb.Error as e:
+    except storage.DB_ERRORS as e:
         logging.error(f"DB Error clearing host_history: {e}")
         conn.rollback()
         return jsonify({"error": f"Database error during history clear: {e}"}), 500
@@ -288,13 +296,55 @@ def delete_all_history():
         if conn: conn.close()
 # --- END NEW ROUTE ---
 
+# === Custom OUI Helpers ===
+def read_custom_oui_map():
+    """Returns the {prefix: vendor} map of the current custom OUI file ({} if missing)."""
+    if not os.path.exists(CUSTOM_OUI_FULL_PATH): return {}
+    with open(CUSTOM_OUI_FULL_PATH, 'r', encoding='utf-8') as f: return oui.parse_custom_oui_lines(f, CUSTOM_OUI_FILE)[0]
+
+def reclassify_hosts_for_oui_change(old_map, new_map, apply):
+    """
+    Re-vendors only the hosts under prefixes changed between old_map and new_map.
+    Prefixes removed from the custom file fall back to the standard OUI list, or to
+    "Unknown" if that list is not available (as get_vendor does), so offline hosts
+    are corrected too. Returns the number of hosts (to be) re-vendored, or None if
+    the DB is unavailable.
+    """
+    changed_prefixes = oui.diff_prefix_maps(old_map, new_map)
+    if not changed_prefixes: return 0
+    standard_map = {}
+    if changed_prefixes - new_map.keys():
+        try: standard_map = oui.read_oui_file(OUI_FULL_PATH)
+        except (IOError, UnicodeDecodeError) as e:
+            logging.warning(f"Standard OUI file unavailable ({e}), hosts under removed custom prefixes set to 'Unknown'.")
+    conn = get_db_connection()
+    if not conn: return None
+    try: return db.reclassify_vendors(conn, changed_prefixes, new_map, standard_map, apply=apply)
+    finally: conn.close()
+
 @app.route('/api/custom_oui/save', methods=['POST'])
 def save_custom_oui():
-    """API: Save content to the custom OUI file."""
+    """
+    API: Save content to the custom OUI file and re-vendor the affected hosts.
+    With {"preview": true} nothing is saved; only the number of affected hosts is returned.
+    """
     if not request.is_json: return jsonify({"error": "JSON required"}), 400
-    data = request.get_json(); new_content = data.get('content')
+    data = request.get_json(); new_content = data.get('content'); preview = bool(data.get('preview'))
     if new_content is None: return jsonify({"error": "'content' missing"}), 400
+    try: old_map = read_custom_oui_map()
+    except Exception as e: logging.error(f"Error reading custom OUI: {e}"); return jsonify({"error": f"Error reading file: {e}. Check permissions."}), 500
+    new_map = oui.parse_custom_oui_lines(new_content.splitlines(), CUSTOM_OUI_FILE)[0]
+    if preview:
+        try: affected_hosts = reclassify_hosts_for_oui_change(old_map, new_map, apply=False)
+        except storage.DB_ERRORS as e: logging.error(f"DB Error previewing custom OUI change: {e}"); return jsonify({"error": f"DB error: {e}"}), 500
+        if affected_hosts is None: return jsonify({"error": "DB connection failed"}), 500
+        return jsonify({"success": True, "preview": True, "affected_hosts": affected_hosts, "changed_prefixes": len(oui.diff_prefix_maps(old_map, new_map))})
     try:
         with open(CUSTOM_OUI_FULL_PATH, 'w', encoding='utf-8') as f: f.write(new_content)
-        logging.info(f"Custom OUI file '{CUSTOM_OUI_FILE}' saved."); return jsonify({"success": True, "message": f"File '{CUSTOM_OUI_FILE}' saved."})
+        logging.info(f"Custom OUI file '{CUSTOM_OUI_FILE}' saved.")
     except Exception as e: logging.error(f"Error writing custom OUI: {e}"); return jsonify({"error": f"Error saving file: {e}. Check permissions."}), 500
+    # The file is saved at this point: a DB failure only delays the vendor update to the next scan
+    try: reclassified = reclassify_hosts_for_oui_change(old_map, new_map, apply=True)
+    except storage.DB_ERRORS as e: logging.error(f"DB Error re-vendoring hosts: {e}"); reclassified = None
+    if reclassified is None: return jsonify({"success": True, "reclassified_hosts": None, "message": f"File '{CUSTOM_OUI_FILE}' saved. Host vendors will be updated by the next scan."})
+    return jsonify({"success": True, "reclassified_hosts": reclassified, "message": f"File '{CUSTOM_OUI_FILE}' saved. Vendor updated for {reclassified} host(s)."})